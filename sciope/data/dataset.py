@@ -18,8 +18,91 @@ Dataset Class
 # Imports
 import numpy as np
 from collections import OrderedDict
+import json
+import os
 from scipy.stats.mstats import mquantiles
 from scipy.stats import zscore
+from sciope.data.spatial_index import SpatialIndex
+
+
+# Compact integer types tried, in order, when trajectories are stored with ts_dtype='auto'
+COMPACT_INTEGER_DTYPES = (np.uint16, np.uint32, np.int32)
+
+
+def _is_integral(values):
+	"""
+	True if all entries of 'values' are integers, possibly stored as floats
+	"""
+	if np.issubdtype(values.dtype, np.integer) or np.issubdtype(values.dtype, np.bool_):
+		return True
+	if not np.issubdtype(values.dtype, np.floating):
+		return False
+	return bool(np.all(np.isfinite(values)) and np.all(np.floor(values) == values))
+
+
+def _fits(values, dtype):
+	"""
+	True if the integral 'values' can be represented exactly in the integer type 'dtype'
+	"""
+	if values.size == 0:
+		return True
+	info = np.iinfo(dtype)
+	return bool(values.min() >= info.min and values.max() <= info.max)
+
+
+def _lossless_integer_dtype(values):
+	"""
+	The smallest of COMPACT_INTEGER_DTYPES that holds 'values' exactly, or None if there is none
+	"""
+	if not _is_integral(values):
+		return None
+	for dtype in COMPACT_INTEGER_DTYPES:
+		if _fits(values, dtype):
+			return np.dtype(dtype)
+	return None
+
+
+def _to_storage_dtype(values, dtype, label):
+	"""
+	Cast 'values' to the declared storage type of a DataSet attribute.
+	:param values: the array to be stored
+	:param dtype: None (store as given), 'auto' (lossless downcast to a compact integer type where possible) or a
+	numpy dtype. Integer types are checked for non-integral values and overflow.
+	:param label: name of the data, used in error messages
+	:return: the cast array
+	"""
+	values = np.asarray(values)
+	if dtype is None:
+		return values
+	if _is_auto(dtype):
+		compact = _lossless_integer_dtype(values)
+		return values if compact is None else values.astype(compact)
+
+	dtype = np.dtype(dtype)
+	if np.issubdtype(dtype, np.integer):
+		if not _is_integral(values):
+			raise ValueError("Cannot store non-integral {0} as {1}".format(label, dtype.name))
+		if not _fits(values, dtype):
+			raise ValueError("{0} in range [{1}, {2}] overflows storage type {3}".format(label, values.min(),
+																						 values.max(), dtype.name))
+	return values.astype(dtype, copy=False)
+
+
+def _is_auto(dtype):
+	return isinstance(dtype, str) and dtype == 'auto'
+
+
+def _dtype_name(dtype):
+	return dtype if dtype is None or _is_auto(dtype) else np.dtype(dtype).name
+
+
+def _to_json(value):
+	"""
+	Fallback serializer for numpy values stored in DataSet.configurations
+	"""
+	if isinstance(value, (np.ndarray, np.generic)):
+		return value.tolist()
+	raise TypeError("Object of type {0} is not JSON serializable".format(type(value).__name__))
 
 
 # Class definition
@@ -35,19 +118,54 @@ class DataSet(object):
 	* outlier_column_indices	(columns containing outliers)
 	* size
 	* configurations 			(OrderedDict with relavant information) 
+	* ts_dtype					(storage type of time series: None, 'auto' or e.g. np.uint16)
+	* s_dtype					(storage type of summary statistics: None, np.float32 or np.float64)
 
 	
 	Methods:
 	* impute 					(treat missing values in summary statistics data) 
 	* get_size					(returns current size of the dataset)
 	* add_points				(add data to the dataset, data can be added incrementally)
+	* get_time_series			(time series, optionally upcast to a wider type)
+	* get_summary_stats			(summary statistics, optionally upcast to a wider type)
 	* process_outliers			(check summary stats that contain outliers, and apply log scaling)
+	* save						(write the dataset to a directory of raw .npy arrays)
+	* load						(open a saved dataset, memory-mapping the arrays)
+	* build_index				(build a spatial index over inputs or summary statistics, maintained on append)
+	* query_box					(indices of points inside an axis-aligned box)
+	* query_radius				(indices of points within a distance of a given point)
+	* knn						(distances and indices of the k nearest points)
+	* take						(a new dataset holding only the given points)
 
 	
 	"""
+
+	# Array-valued attributes that are persisted as separate .npy files by save/load
+	array_attributes = ('x', 'y', 'ts', 's', 'outlier_column_indices')
+
+	# Version of the on-disk layout written by save
+	storage_version = 1
 	
-	def __init__(self, name):
+	def __init__(self, name, ts_dtype=None, s_dtype=None):
+		"""
+		:param name: name of the dataset
+		:param ts_dtype: storage type of time series. None keeps the type of the added data, 'auto' stores integral
+		data (e.g. SSA molecule counts) in the smallest lossless type of uint16/uint32/int32, and an integer type
+		such as np.uint16 enforces that type, raising ValueError on non-integral values or overflow.
+		:param s_dtype: storage type of summary statistics, None, np.float32 or np.float64
+		"""
+		if ts_dtype is not None and not _is_auto(ts_dtype):
+			ts_dtype = np.dtype(ts_dtype)
+			if not (np.issubdtype(ts_dtype, np.integer) or np.issubdtype(ts_dtype, np.floating)):
+				raise ValueError("ts_dtype must be None, 'auto' or a numeric type, got {0}".format(ts_dtype))
+		if s_dtype is not None:
+			s_dtype = np.dtype(s_dtype)
+			if not np.issubdtype(s_dtype, np.floating):
+				raise ValueError("s_dtype must be a floating point type, got {0}".format(s_dtype))
+
 		self.name = name
+		self.ts_dtype = ts_dtype
+		self.s_dtype = s_dtype
 		self.x = None
 		self.y = None
 		self.ts = None
@@ -56,13 +174,18 @@ class DataSet(object):
 		self.outlier_detection = False
 		self.configurations = OrderedDict()
 		self.size = 0
+		self.spatial_indices = dict()
 			
 	def get_size(self):
 		"""
-		TODO:
-		Returns the current number of points in the dataset
+		Returns the current number of points in the dataset, i.e. the number of rows of the first point-wise array
+		(inputs, targets, time series or summary statistics) that is set
 		"""
-		return self.size
+		for attr in ('x', 'y', 'ts', 's'):
+			value = getattr(self, attr)
+			if value is not None:
+				return len(value)
+		return 0
 		
 	def add_points(self, inputs=None, targets=None, time_series=None, summary_stats=None):
 		"""
@@ -75,6 +198,7 @@ class DataSet(object):
 				self.x = np.concatenate((self.x, inputs), axis=0)
 			else:
 				self.x = inputs
+			self._update_index('x')
 				
 		if targets is not None:
 			if self.y is not None:
@@ -83,12 +207,14 @@ class DataSet(object):
 				self.y = targets
 		
 		if time_series is not None:
+			time_series = _to_storage_dtype(time_series, self.ts_dtype, 'time series')
 			if self.ts is not None:
 				self.ts = np.concatenate((self.ts, time_series), axis=0)
 			else:
 				self.ts = time_series
 		
 		if summary_stats is not None:
+			summary_stats = _to_storage_dtype(summary_stats, self.s_dtype, 'summary statistics')
 			if self.outlier_detection and self.outlier_column_indices is not None:
 				summary_stats[:, self.outlier_column_indices] = np.log(summary_stats[:, self.outlier_column_indices])
 			
@@ -99,6 +225,29 @@ class DataSet(object):
 
 			if self.outlier_detection and len(self.s) > 1:
 				self.process_outliers()
+			self._update_index('s')
+
+		self.size = self.get_size()
+
+	def get_time_series(self, dtype=None):
+		"""
+		Returns the time series, optionally converted to 'dtype' (e.g. np.float64 for consumers that expect floats)
+		:param dtype: target type, None returns the stored array
+		:return: the time series
+		"""
+		if self.ts is None or dtype is None:
+			return self.ts
+		return self.ts.astype(dtype, copy=False)
+
+	def get_summary_stats(self, dtype=None):
+		"""
+		Returns the summary statistics, optionally converted to 'dtype'
+		:param dtype: target type, None returns the stored array
+		:return: the summary statistics
+		"""
+		if self.s is None or dtype is None:
+			return self.s
+		return self.s.astype(dtype, copy=False)
 
 	def process_outliers(self, mode='zscore'):
 		"""
@@ -143,6 +292,158 @@ class DataSet(object):
 
 		self.s[:, indices_to_process] = np.log(self.s[:, indices_to_process])
 
+		# Summary statistics changed in place, so a tree built over them is no longer valid
+		if 's' in self.spatial_indices:
+			self.spatial_indices['s'].update(self.s)
+			self.spatial_indices['s'].rebuild()
+
+	def build_index(self, attribute='x', rebuild_ratio=0.25):
+		"""
+		Build a k-d tree index over the inputs ('x') or summary statistics ('s'). The index is kept up to date by
+		add_points, so subsequent range and nearest neighbour queries do not scan the whole dataset.
+		:param attribute: 'x' or 's'
+		:param rebuild_ratio: fraction of appended, not yet indexed points that triggers a rebuild of the tree
+		:return: -
+		"""
+		if attribute not in ('x', 's'):
+			raise ValueError("Spatial indices are supported for 'x' and 's', got {0}".format(attribute))
+		if getattr(self, attribute) is None:
+			raise ValueError("Cannot index attribute '{0}', the dataset holds no such data".format(attribute))
+		self.spatial_indices[attribute] = SpatialIndex(getattr(self, attribute), rebuild_ratio=rebuild_ratio)
+
+	def _update_index(self, attribute):
+		if attribute in self.spatial_indices:
+			self.spatial_indices[attribute].update(getattr(self, attribute))
+
+	def _get_index(self, attribute):
+		if attribute not in self.spatial_indices:
+			self.build_index(attribute)
+		return self.spatial_indices[attribute]
+
+	def query_box(self, lower, upper, attribute='x'):
+		"""
+		Find the points whose inputs (or summary statistics) lie in the box [lower, upper]. An index is built on
+		first use.
+		:param lower: lower bound of each dimension
+		:param upper: upper bound of each dimension
+		:param attribute: 'x' or 's'
+		:return: sorted array of point indices
+		"""
+		return self._get_index(attribute).query_box(lower, upper)
+
+	def query_radius(self, point, r, attribute='x', p=2.0):
+		"""
+		Find the points within distance 'r' of 'point'. An index is built on first use.
+		:param point: the query point
+		:param r: the radius
+		:param attribute: 'x' or 's'
+		:param p: order of the Minkowski norm, 2 is Euclidean
+		:return: sorted array of point indices
+		"""
+		return self._get_index(attribute).query_radius(point, r, p)
+
+	def knn(self, points, k=1, attribute='x', p=2.0):
+		"""
+		Find the 'k' nearest points to one or several query points. An index is built on first use.
+		:param points: a single query point or an array of query points
+		:param k: the number of neighbours
+		:param attribute: 'x' or 's'
+		:param p: order of the Minkowski norm, 2 is Euclidean
+		:return: distances and point indices, sorted by distance
+		"""
+		return self._get_index(attribute).knn(points, k, p)
+
+	def take(self, indices, name=None):
+		"""
+		Create a new dataset holding only the points at 'indices', e.g. the result of a range query.
+		:param indices: integer index array or slice; a slice gives views of the arrays instead of copies
+		:param name: name of the new dataset, defaults to the name of this dataset
+		:return: the new dataset
+		"""
+		subset = self.__class__.__new__(self.__class__)
+		DataSet.__init__(subset, self.name if name is None else name, self.ts_dtype, self.s_dtype)
+		for attr in self.array_attributes:
+			value = getattr(self, attr)
+			if value is not None and attr != 'outlier_column_indices':
+				value = value[indices]
+			setattr(subset, attr, value)
+		subset.size = subset.get_size()
+		subset.outlier_detection = self.outlier_detection
+		subset.configurations = OrderedDict(self.configurations)
+		return subset
+
+	def save(self, path):
+		"""
+		Write the dataset to the directory 'path'. Each array attribute is stored as a raw (uncompressed) .npy file
+		so that it can later be memory-mapped, while name, flags and configurations go into 'metadata.json'.
+		Existing array files in 'path' belonging to attributes that are now None are removed. Each file is written
+		to a temporary name and then renamed into place, so saving back into the directory a dataset was loaded from
+		does not truncate the files its arrays are still memory-mapped from.
+		:param path: target directory, created if it does not exist
+		:return: -
+		"""
+		if not os.path.isdir(path):
+			os.makedirs(path)
+
+		stored = []
+		for attr in self.array_attributes:
+			filename = os.path.join(path, attr + '.npy')
+			value = getattr(self, attr)
+			if value is None:
+				if os.path.isfile(filename):
+					os.remove(filename)
+				continue
+			# A file object keeps np.save from appending '.npy' to the temporary name
+			with open(filename + '.tmp', 'wb') as f:
+				np.save(f, np.asarray(value), allow_pickle=False)
+			os.replace(filename + '.tmp', filename)
+			stored.append(attr)
+
+		metadata = OrderedDict()
+		metadata['storage_version'] = self.storage_version
+		metadata['name'] = self.name
+		metadata['size'] = self.get_size()
+		metadata['outlier_detection'] = self.outlier_detection
+		metadata['ts_dtype'] = _dtype_name(self.ts_dtype)
+		metadata['s_dtype'] = _dtype_name(self.s_dtype)
+		metadata['arrays'] = stored
+		metadata['configurations'] = self.configurations
+		with open(os.path.join(path, 'metadata.json'), 'w') as f:
+			json.dump(metadata, f, indent=2, default=_to_json)
+
+	@classmethod
+	def load(cls, path, mmap_mode='c'):
+		"""
+		Open a dataset previously written with save. Arrays are memory-mapped rather than read, so opening is
+		independent of the size of the dataset and data is only paged in when accessed.
+		:param path: directory written by save
+		:param mmap_mode: numpy memory-map mode; the default 'c' (copy-on-write) keeps in-place operations such as
+		outlier log-scaling in memory without touching the files. Use 'r+' to write through, or None to read
+		everything into memory.
+		:return: the loaded dataset, an instance of the class load was called on
+		"""
+		with open(os.path.join(path, 'metadata.json'), 'r') as f:
+			metadata = json.load(f, object_pairs_hook=OrderedDict)
+
+		if metadata['storage_version'] > cls.storage_version:
+			raise ValueError("Dataset at {0} has storage version {1}, this version of sciope reads up to {2}"
+							 .format(path, metadata['storage_version'], cls.storage_version))
+
+		# Bypass subclass constructors, which may take different arguments; all state is restored below
+		dataset = cls.__new__(cls)
+		DataSet.__init__(dataset, metadata['name'], metadata.get('ts_dtype'), metadata.get('s_dtype'))
+		for attr in cls.array_attributes:
+			if attr in metadata['arrays']:
+				value = np.load(os.path.join(path, attr + '.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+			else:
+				value = None
+			setattr(dataset, attr, value)
+
+		dataset.size = dataset.get_size()
+		dataset.outlier_detection = metadata['outlier_detection']
+		dataset.configurations = metadata['configurations']
+		return dataset
+
 	@staticmethod
 	def sync_log_scaled_datasets(fixed_ds, sim_ds, sim_stats):
 		"""
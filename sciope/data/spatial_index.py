@@ -0,0 +1,201 @@
+# Copyright 2019 Prashant Singh, Fredrik Wrede and Andreas Hellander
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Spatial Index for range and nearest neighbour queries over the rows of a dataset
+"""
+
+# Imports
+from scipy.spatial import cKDTree, distance_matrix
+import numpy as np
+
+# Largest number of query-to-buffer distances computed at once by knn
+BUFFER_CHUNK_ELEMENTS = 1 << 22
+
+
+def minkowski_distance(points, point, p=2.0):
+    """
+    Minkowski distance of order p between each row of 'points' and a single 'point'
+    :param points: m x d array
+    :param point: d-sized vector
+    :param p: order of the norm, 1 is Manhattan, 2 is Euclidean and np.inf is Chebyshev
+    :return: m-sized vector of distances
+    """
+    diff = np.abs(points - point)
+    if p == np.inf:
+        return diff.max(axis=1)
+    if p == 1:
+        return diff.sum(axis=1)
+    return np.power(np.power(diff, p).sum(axis=1), 1.0 / p)
+
+
+# Class definition
+class SpatialIndex(object):
+    """
+    k-d tree index over the rows of a 2D array that can grow by appending rows.
+
+    Rows appended after the last build are kept in a buffer that is searched by brute force, and the tree is rebuilt
+    once the buffer grows beyond 'rebuild_ratio' times the number of points in the tree. This keeps appends cheap while
+    queries stay logarithmic in the size of the indexed data.
+
+    Methods:
+    * update            (point the index at the grown array)
+    * rebuild           (rebuild the tree over all points)
+    * query_box         (indices of points within an axis-aligned box)
+    * query_radius      (indices of points within a distance of a point)
+    * knn               (distances and indices of the k nearest neighbours)
+    """
+
+    def __init__(self, points, rebuild_ratio=0.25, leafsize=16):
+        """
+        :param points: n x d array of points to index; the array is referenced, not copied
+        :param rebuild_ratio: rebuild the tree when the unindexed buffer exceeds this fraction of the tree size
+        :param leafsize: leaf size of the k-d tree
+        """
+        self.rebuild_ratio = rebuild_ratio
+        self.leafsize = leafsize
+        self.points = None
+        self.tree = None
+        self.tree_size = 0
+        self.update(points)
+        self.rebuild()
+
+    @property
+    def size(self):
+        return self.points.shape[0]
+
+    def update(self, points):
+        """
+        Point the index at 'points', e.g. after rows have been appended to the indexed array. The leading rows must be
+        the previously indexed points, otherwise the tree is rebuilt.
+        :param points: n x d array
+        :return: -
+        """
+        points = np.asarray(points)
+        self.points = points.reshape(points.shape[0], -1)
+        if self.tree is None:
+            return
+        if self.size < self.tree_size or self.size - self.tree_size > self.rebuild_ratio * self.tree_size:
+            self.rebuild()
+
+    def rebuild(self):
+        """
+        Build the tree over all points. Must be called if indexed points are modified in place.
+        :return: -
+        """
+        if self.size > 0:
+            self.tree = cKDTree(self.points, leafsize=self.leafsize)
+        else:
+            self.tree = None
+        self.tree_size = self.size
+
+    def _buffer(self):
+        return self.points[self.tree_size:]
+
+    def query_box(self, lower, upper):
+        """
+        Find all points in the closed axis-aligned box [lower, upper]
+        :param lower: d-sized vector of lower bounds
+        :param upper: d-sized vector of upper bounds
+        :return: sorted array of row indices
+        """
+        lower = np.asarray(lower, dtype=float)
+        upper = np.asarray(upper, dtype=float)
+        found = []
+        if self.tree is not None:
+            # Chebyshev ball around the box center covering the box, then trim to the box
+            center = (lower + upper) / 2
+            candidates = np.asarray(self.tree.query_ball_point(center, np.max(upper - center), p=np.inf), dtype=int)
+            inside = np.all((self.points[candidates] >= lower) & (self.points[candidates] <= upper), axis=1)
+            found.append(candidates[inside])
+
+        buffer = self._buffer()
+        inside = np.all((buffer >= lower) & (buffer <= upper), axis=1)
+        found.append(np.flatnonzero(inside) + self.tree_size)
+        return np.sort(np.concatenate(found))
+
+    def query_radius(self, point, r, p=2.0):
+        """
+        Find all points within distance 'r' of 'point'
+        :param point: d-sized vector
+        :param r: the radius
+        :param p: order of the Minkowski norm
+        :return: sorted array of row indices
+        """
+        point = np.asarray(point, dtype=float).ravel()
+        found = []
+        if self.tree is not None:
+            found.append(np.asarray(self.tree.query_ball_point(point, r, p=p), dtype=int))
+
+        buffer_distances = minkowski_distance(self._buffer(), point, p)
+        found.append(np.flatnonzero(buffer_distances <= r) + self.tree_size)
+        return np.sort(np.concatenate(found))
+
+    def _merge_buffer(self, points, buffer, distances, indices, k, p):
+        """
+        Merge the k nearest neighbours found in the tree with the buffer, scored by brute force. Query points are
+        processed in chunks so that at most BUFFER_CHUNK_ELEMENTS distances are held at once.
+        """
+        num_queries = points.shape[0]
+        num_buffered = buffer.shape[0]
+        chunk_size = max(1, BUFFER_CHUNK_ELEMENTS // num_buffered)
+        merged_distances = np.empty((num_queries, k))
+        merged_indices = np.empty((num_queries, k), dtype=int)
+        for start in range(0, num_queries, chunk_size):
+            stop = min(start + chunk_size, num_queries)
+            buffer_distances = distance_matrix(points[start:stop], buffer, p=p)
+            buffer_indices = np.arange(self.tree_size, self.size)
+            if num_buffered > k:
+                # Only the k closest buffered points can enter the result
+                closest = np.argpartition(buffer_distances, k - 1, axis=1)[:, :k]
+                buffer_distances = np.take_along_axis(buffer_distances, closest, axis=1)
+                buffer_indices = buffer_indices[closest]
+            else:
+                buffer_indices = np.broadcast_to(buffer_indices, buffer_distances.shape)
+            chunk_distances = np.hstack((distances[start:stop], buffer_distances))
+            chunk_indices = np.hstack((indices[start:stop], buffer_indices))
+            order = np.argsort(chunk_distances, axis=1, kind='stable')[:, :k]
+            merged_distances[start:stop] = np.take_along_axis(chunk_distances, order, axis=1)
+            merged_indices[start:stop] = np.take_along_axis(chunk_indices, order, axis=1)
+        return merged_distances, merged_indices
+
+    def knn(self, points, k=1, p=2.0):
+        """
+        Find the k nearest neighbours of one or several query points
+        :param points: d-sized vector or m x d array of query points
+        :param k: number of neighbours
+        :param p: order of the Minkowski norm
+        :return: distances and row indices, each of shape (k,) for a single point or (m, k), sorted by distance
+        """
+        points = np.asarray(points, dtype=float)
+        single = points.ndim == 1
+        points = np.atleast_2d(points)
+        num_queries = points.shape[0]
+        k = min(k, self.size)
+
+        if self.tree is not None:
+            tree_k = min(k, self.tree_size)
+            distances, indices = self.tree.query(points, k=tree_k, p=p)
+            distances = distances.reshape(num_queries, tree_k)
+            indices = indices.reshape(num_queries, tree_k)
+        else:
+            distances = np.empty((num_queries, 0))
+            indices = np.empty((num_queries, 0), dtype=int)
+
+        buffer = self._buffer()
+        if buffer.shape[0] > 0:
+            distances, indices = self._merge_buffer(points, buffer, distances, indices, k, p)
+
+        if single:
+            return distances[0], indices[0]
+        return distances, indices
@@ -1 +1 @@
-__all__ = ["initial_design_base", "latin_hypercube_sampling", "random_sampling", "factorial_design"]
\ No newline at end of file
+__all__ = ["initial_design_base", "latin_hypercube_sampling", "optimized_latin_hypercube_sampling", "random_sampling", "sobol_design", "factorial_design"]
\ No newline at end of file
@@ -18,18 +18,86 @@ Factorial Initial Design
 # Imports
 from sciope.designs.initial_design_base import InitialDesignBase
 from sciope.utilities.housekeeping import sciope_logger as ml
-import gpflowopt
+import numpy as np
 
 # Set up the logger
 logger = ml.SciopeLogger().get_logger()
 
 
+class FactorialGrid(object):
+    """
+    Lazy, indexable view of a full factorial grid. Points are decoded on demand from their flat index by mixed-radix
+    decoding, so grids far too large to materialize can be streamed in chunks, accessed at random and split by index
+    range across workers. The point order is the order of FactorialDesign.generate.
+
+    Methods:
+    * __len__           (number of grid points)
+    * __getitem__       (point i, a slice or an array of indices)
+    * chunks            (iterate over the grid in blocks of points)
+    """
+
+    def __init__(self, levels):
+        """
+        :param levels: list with the 1D array of levels of each dimension
+        """
+        self.levels = [np.asarray(level, dtype=float) for level in levels]
+        num_variables = len(self.levels)
+        # Cartesian meshgrid indexing: the second dimension varies slowest, then the first and the remaining ones,
+        # the last dimension fastest
+        self.order = [1, 0] + list(range(2, num_variables)) if num_variables > 1 else [0]
+        self.radices = [len(self.levels[k]) for k in self.order]
+        self.size = int(np.prod(self.radices, dtype=object))
+
+    def __len__(self):
+        return self.size
+
+    def decode(self, indices):
+        """
+        Points at the given flat indices
+        :param indices: array of indices in [0, len(self))
+        :return: len(indices) x d array of points
+        """
+        remainder = np.array(indices, dtype=np.int64)
+        if np.any(remainder < 0) or np.any(remainder >= self.size):
+            raise IndexError("Factorial grid index out of range")
+        points = np.empty((remainder.size, len(self.levels)))
+        for position in reversed(range(len(self.order))):
+            remainder, digit = np.divmod(remainder, self.radices[position])
+            dimension = self.order[position]
+            points[:, dimension] = self.levels[dimension][digit]
+        return points
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.decode(np.arange(*key.indices(self.size), dtype=np.int64))
+        if np.ndim(key) == 0:
+            index = int(key)
+            if index < 0:
+                index += self.size
+            return self.decode([index])[0]
+        indices = np.asarray(key, dtype=np.int64)
+        return self.decode(np.where(indices < 0, indices + self.size, indices))
+
+    def chunks(self, chunk_size=10000, start=0, stop=None):
+        """
+        Iterate over the points with index in [start, stop) in blocks of at most 'chunk_size' points
+        :param chunk_size: number of points per block
+        :param start: first index
+        :param stop: end index (exclusive), defaults to the size of the grid
+        :return: generator of chunk_size x d arrays
+        """
+        stop = self.size if stop is None else min(stop, self.size)
+        for chunk_start in range(start, stop, chunk_size):
+            yield self.decode(np.arange(chunk_start, min(chunk_start + chunk_size, stop), dtype=np.int64))
+
+
 # Class definition
 class FactorialDesign(InitialDesignBase):
     """
-    Factorial design implemented through gpflowopt
+    Full factorial design: a regular grid with 'n' equally spaced levels, including the bounds, in each dimension
 
     * InitialDesignBase.generate(n)
+    * InitialDesignBase.generate_shard(n_total, shard_id, n_shards, seed)
     """
 
     def __init__(self, xmin, xmax):
@@ -37,17 +105,34 @@ class FactorialDesign(InitialDesignBase):
         super(FactorialDesign, self).__init__(name, xmin, xmax)
         logger.info("Factorial design in {0} dimensions initialized".format(len(self.xmin)))
 
+    def grid(self, n):
+        """
+        Lazy view of the factorial design of 'n' levels, for grids too large to generate at once
+        :param n: number of levels in each dimension
+        :return: FactorialGrid over the n^d points, in the order of 'generate'
+        """
+        num_variables = len(self.xmin)
+        return FactorialGrid([np.linspace(self.xmin[i], self.xmax[i], n) for i in range(num_variables)])
+
     def generate(self, n):
         """
         Sub-classable method for generating a factorial design of 'n' levels in the given 'domain'.
         The number of generated points is n^d.
         """
         num_variables = len(self.xmin)
-        gpf_domain = gpflowopt.domain.ContinuousParameter('x0', self.xmin[0], self.xmax[0])
-        for i in range(1, num_variables):
-            var_name = 'x' + repr(i)
-            gpf_domain = gpf_domain + gpflowopt.domain.ContinuousParameter(var_name, self.xmin[i], self.xmax[i])
-
-        design = gpflowopt.design.FactorialDesign(n, gpf_domain)
-        logger.info("Factorial design: generated {0} points in {1} dimensions".format(n, num_variables))
-        return design.generate()
+        # The point order is that of the former gpflowopt implementation (Cartesian meshgrid indexing)
+        design = self.grid(n)[:]
+        logger.info("Factorial design: generated {0} points in {1} dimensions".format(design.shape[0], num_variables))
+        return design
+
+    def generate_shard(self, n_total, shard_id, n_shards, seed=None):
+        """
+        Part 'shard_id' of 'n_shards' of the factorial design of 'n_total' levels, decoded from the lazy grid. As in
+        'generate', 'n_total' is the number of levels per dimension, the n_total^d points are split. 'seed' is unused.
+        """
+        grid = self.grid(n_total)
+        start, stop = self.shard_bounds(len(grid), shard_id, n_shards)
+        design = grid[start:stop]
+        logger.info("Factorial design: generated shard {0} of {1} ({2} points)".format(shard_id, n_shards,
+                                                                                    design.shape[0]))
+        return design
@@ -28,6 +28,10 @@ class InitialDesignBase(object):
     Each initial design type must implement the methods described herein:
 
     * InitialDesignBase.generate(n,domain)
+
+    Designs that can be generated in parts also implement:
+
+    * InitialDesignBase.generate_shard(n_total, shard_id, n_shards, seed)
     """
     __metaclass__ = ABCMeta
 
@@ -44,3 +48,21 @@ class InitialDesignBase(object):
         """
         Sub-classable method for generating 'n' points within a given domain. Each derived class must implement.
         """
+
+    @staticmethod
+    def shard_bounds(n_total, shard_id, n_shards):
+        """
+        Index range [start, stop) of shard 'shard_id' when 'n_total' points are split into 'n_shards' contiguous,
+        near-equal parts
+        """
+        if not 0 <= shard_id < n_shards:
+            raise ValueError("shard_id must be in [0, {0}), got {1}".format(n_shards, shard_id))
+        return shard_id * n_total // n_shards, (shard_id + 1) * n_total // n_shards
+
+    def generate_shard(self, n_total, shard_id, n_shards, seed=None):
+        """
+        Sub-classable method for generating the part 'shard_id' of 'n_shards' of a design of 'n_total' points, without
+        generating the rest of it. All workers passing the same 'n_total' and 'seed' get disjoint slices of the same
+        design, which concatenated in shard order give the full design.
+        """
+        raise NotImplementedError("{0} cannot be generated in shards".format(self.name))
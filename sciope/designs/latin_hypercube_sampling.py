@@ -17,24 +17,79 @@ Latin Hypercube Sampling Initial Design
 
 # Imports
 from sciope.designs.initial_design_base import InitialDesignBase
+from sciope.designs.optimized_latin_hypercube_sampling import OptimizedLatinHypercube
 from sciope.utilities.housekeeping import sciope_logger as ml
-import gpflowopt
+import numpy as np
 
 # Set up the logger
 logger = ml.SciopeLogger().get_logger()
 
 
+# Multiplicative constants of the splitmix64 finalizer
+_MIX = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB))
+
+
+def _mix(values, key):
+    """
+    Pseudo-random 64-bit hash of each of 'values' (uint64 array) under 'key'
+    """
+    z = (values + key) * _MIX[0]
+    z = (z ^ (z >> np.uint64(30))) * _MIX[1]
+    z = (z ^ (z >> np.uint64(27))) * _MIX[2]
+    return z ^ (z >> np.uint64(31))
+
+
+def feistel_permute(indices, n, keys):
+    """
+    Keyed pseudo-random permutation of 0..n-1, evaluated at 'indices' only. A balanced Feistel network permutes the
+    smallest power-of-4 domain holding n; values that fall outside [0, n) are mapped again until they land inside it
+    (cycle walking), which keeps the result a permutation of 0..n-1.
+    :param indices: array of integers in [0, n)
+    :param n: size of the permuted range
+    :param keys: uint64 array of round keys, one Feistel round per key
+    :return: the permuted indices
+    """
+    half_bits = max(1, (int(n - 1).bit_length() + 1) // 2)
+    shift = np.uint64(half_bits)
+    mask = np.uint64((1 << half_bits) - 1)
+    values = np.array(indices, dtype=np.uint64)
+    outside = np.ones(values.shape, dtype=bool)
+    while np.any(outside):
+        walking = values[outside]
+        left, right = walking >> shift, walking & mask
+        for key in keys:
+            left, right = right, left ^ (_mix(right, key) & mask)
+        values[outside] = (left << shift) | right
+        outside[outside] = values[outside] >= n
+    return values.astype(np.int64)
+
+
 # Class definition
 class LatinHypercube(InitialDesignBase):
     """
-    Latin Hypercube Sampling implemented through gpflowopt
+    Latin Hypercube Sampling: each dimension is divided into 'n' equally sized strata and every stratum holds exactly
+    one point. By default, 'generate' returns a space-filling design, as the gpflowopt based implementation did: the
+    pairing of strata across dimensions is optimized for the maximin criterion (see OptimizedLatinHypercube) and
+    points are placed at the centers of their strata. With space_filling=False, strata are paired by random
+    permutations and each point is placed uniformly at random within its stratum.
+
+    In 'generate_shard' the permutations are keyed Feistel permutations, so the stratum of any point can be computed
+    without building the whole permutation, and each worker generates only its own points. Shards are always random
+    latin hypercubes, as optimizing the design requires all of its points.
 
     * InitialDesignBase.generate(n)
+    * InitialDesignBase.generate_shard(n_total, shard_id, n_shards, seed)
     """
 
-    def __init__(self, xmin, xmax):
+    def __init__(self, xmin, xmax, space_filling=True):
+        """
+        :param xmin: lower bound of each dimension
+        :param xmax: upper bound of each dimension
+        :param space_filling: optimize the design for the maximin criterion in 'generate'
+        """
         name = 'LatinHypercube'
         super(LatinHypercube, self).__init__(name, xmin, xmax)
+        self.space_filling = space_filling
         logger.info("Latin hypercube design in {0} dimensions initialized".format(len(self.xmin)))
 
     def generate(self, n):
@@ -42,11 +97,43 @@ class LatinHypercube(InitialDesignBase):
         Sub-classable method for generating 'n' points in the given 'domain'.
         """
         num_variables = len(self.xmin)
-        gpf_domain = gpflowopt.domain.ContinuousParameter('x0', self.xmin[0], self.xmax[0])
-        for i in range(1, num_variables):
-            var_name = 'x' + repr(i)
-            gpf_domain = gpf_domain + gpflowopt.domain.ContinuousParameter(var_name, self.xmin[i], self.xmax[i])
+        xmin = np.asarray(self.xmin, dtype=float)
+        xmax = np.asarray(self.xmax, dtype=float)
 
-        design = gpflowopt.design.LatinHyperCube(n, gpf_domain)
+        # Random stratum of each point in each dimension, one column permutation per dimension
+        strata = np.argsort(np.random.rand(n, num_variables), axis=0)
+        if self.space_filling:
+            strata, phi = OptimizedLatinHypercube(self.xmin, self.xmax).optimize(strata)
+            unit_design = (strata + 0.5) / n
+        else:
+            unit_design = (strata + np.random.rand(n, num_variables)) / n
+        design = xmin + unit_design * (xmax - xmin)
         logger.info("Latin hypercube design: generated {0} points in {1} dimensions".format(n, num_variables))
-        return design.generate()
+        return design
+
+    def generate_shard(self, n_total, shard_id, n_shards, seed=None, num_rounds=4):
+        """
+        Rows [start, stop) of the latin hypercube design of 'n_total' points defined by 'seed'
+        :param num_rounds: number of Feistel rounds of each permutation
+        """
+        if seed is None:
+            raise ValueError("A seed shared by all shards is required")
+        start, stop = self.shard_bounds(n_total, shard_id, n_shards)
+        num_variables = len(self.xmin)
+        xmin = np.asarray(self.xmin, dtype=float)
+        xmax = np.asarray(self.xmax, dtype=float)
+
+        key_sequence, jitter_sequence = np.random.SeedSequence(seed).spawn(2)
+        keys = key_sequence.generate_state(num_variables * num_rounds, dtype=np.uint64).reshape(num_variables, -1)
+        rows = np.arange(start, stop)
+        strata = np.column_stack([feistel_permute(rows, n_total, keys[j]) for j in range(num_variables)])
+
+        # Position within the stratum, from a stream advanced past the rows of the preceding shards
+        bit_generator = np.random.PCG64(jitter_sequence)
+        bit_generator.advance(start * num_variables)
+        jitter = np.random.Generator(bit_generator).random((stop - start, num_variables))
+
+        design = xmin + (strata + jitter) / n_total * (xmax - xmin)
+        logger.info("Latin hypercube design: generated shard {0} of {1} ({2} points)".format(shard_id, n_shards,
+                                                                                          stop - start))
+        return design
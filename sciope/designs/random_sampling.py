@@ -18,7 +18,7 @@ Random Sampling Initial Design
 # Imports
 from sciope.designs.initial_design_base import InitialDesignBase
 from sciope.utilities.housekeeping import sciope_logger as ml
-import gpflowopt
+import numpy as np
 
 # Set up the logger
 def get_logger():
@@ -28,9 +28,10 @@ def get_logger():
 # Class definition
 class RandomSampling(InitialDesignBase):
     """
-    Random Sampling implemented through gpflowopt
+    Random Sampling: points drawn uniformly at random within the domain
 
     * InitialDesignBase.generate(n)
+    * InitialDesignBase.generate_shard(n_total, shard_id, n_shards, seed)
     """
 
     def __init__(self, xmin, xmax, use_logger=True):
@@ -45,12 +46,29 @@ class RandomSampling(InitialDesignBase):
         Sub-classable method for generating 'n' points in the given 'domain'.
         """
         num_variables = len(self.xmin)
-        gpf_domain = gpflowopt.domain.ContinuousParameter('x0', self.xmin[0], self.xmax[0])
-        for i in range(1, num_variables):
-            var_name = 'x' + repr(i)
-            gpf_domain = gpf_domain + gpflowopt.domain.ContinuousParameter(var_name, self.xmin[i], self.xmax[i])
-
-        design = gpflowopt.design.RandomDesign(n, gpf_domain)
+        xmin = np.asarray(self.xmin, dtype=float)
+        xmax = np.asarray(self.xmax, dtype=float)
+        design = xmin + np.random.rand(n, num_variables) * (xmax - xmin)
         if self.use_logger:
             self.logger.info("Random design: generated {0} points in {1} dimensions".format(n, num_variables))
-        return design.generate()
+        return design
+
+    def generate_shard(self, n_total, shard_id, n_shards, seed=None):
+        """
+        Rows [start, stop) of the random design of 'n_total' points drawn from a PCG64 stream seeded with 'seed'. The
+        stream is advanced past the rows of the preceding shards instead of drawing them.
+        """
+        if seed is None:
+            raise ValueError("A seed shared by all shards is required")
+        start, stop = self.shard_bounds(n_total, shard_id, n_shards)
+        num_variables = len(self.xmin)
+        xmin = np.asarray(self.xmin, dtype=float)
+        xmax = np.asarray(self.xmax, dtype=float)
+        bit_generator = np.random.PCG64(seed)
+        # Each uniform double consumes one 64-bit output of the stream
+        bit_generator.advance(start * num_variables)
+        design = xmin + np.random.Generator(bit_generator).random((stop - start, num_variables)) * (xmax - xmin)
+        if self.use_logger:
+            self.logger.info("Random design: generated shard {0} of {1} ({2} points)".format(shard_id, n_shards,
+                                                                                           stop - start))
+        return design
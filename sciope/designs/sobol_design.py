@@ -0,0 +1,80 @@
+# Copyright 2019 Prashant Singh, Fredrik Wrede and Andreas Hellander
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Sobol Sequence Initial Design
+"""
+
+# Imports
+from sciope.designs.initial_design_base import InitialDesignBase
+from sciope.utilities.housekeeping import sciope_logger as ml
+from scipy.stats import qmc
+import numpy as np
+import warnings
+
+# Set up the logger
+logger = ml.SciopeLogger().get_logger()
+
+
+# Class definition
+class SobolDesign(InitialDesignBase):
+    """
+    Sobol Sequence: the first 'n' points of a (scrambled) Sobol low-discrepancy sequence, scaled to the domain.
+    Balance properties are best when 'n' is a power of 2.
+
+    * InitialDesignBase.generate(n)
+    * InitialDesignBase.generate_shard(n_total, shard_id, n_shards, seed)
+    """
+
+    def __init__(self, xmin, xmax, scramble=True, seed=None):
+        """
+        :param xmin: lower bound of each dimension
+        :param xmax: upper bound of each dimension
+        :param scramble: apply Owen scrambling to the sequence
+        :param seed: seed of the scrambling used by 'generate'
+        """
+        name = 'SobolDesign'
+        super(SobolDesign, self).__init__(name, xmin, xmax)
+        self.scramble = scramble
+        self.seed = seed
+        logger.info("Sobol design in {0} dimensions initialized".format(len(self.xmin)))
+
+    def _points(self, start, stop, seed):
+        engine = qmc.Sobol(len(self.xmin), scramble=self.scramble, seed=seed)
+        if start > 0:
+            engine.fast_forward(start)
+        with warnings.catch_warnings():
+            # Sobol warns when the number of points is not a power of 2
+            warnings.simplefilter('ignore', UserWarning)
+            unit_design = engine.random(stop - start)
+        return qmc.scale(unit_design, np.asarray(self.xmin, dtype=float), np.asarray(self.xmax, dtype=float))
+
+    def generate(self, n):
+        """
+        Sub-classable method for generating 'n' points in the given 'domain'.
+        """
+        design = self._points(0, n, self.seed)
+        logger.info("Sobol design: generated {0} points in {1} dimensions".format(n, len(self.xmin)))
+        return design
+
+    def generate_shard(self, n_total, shard_id, n_shards, seed=None):
+        """
+        Rows [start, stop) of the Sobol design of 'n_total' points scrambled with 'seed', obtained by skipping ahead
+        in the sequence
+        """
+        if seed is None and self.scramble:
+            raise ValueError("A seed shared by all shards is required")
+        start, stop = self.shard_bounds(n_total, shard_id, n_shards)
+        design = self._points(start, stop, seed)
+        logger.info("Sobol design: generated shard {0} of {1} ({2} points)".format(shard_id, n_shards, stop - start))
+        return design
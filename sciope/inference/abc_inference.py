@@ -21,10 +21,15 @@ from sciope.utilities.distancefunctions import euclidean as euc
 from sciope.utilities.summarystats import burstiness as bs
 from sciope.utilities.housekeeping import sciope_logger as ml
 from sciope.utilities.housekeeping import sciope_profiler
+from sciope.utilities.transport import shared_memory_transport as smt
 from sciope.data.dataset import DataSet
 import multiprocessing as mp
 import numpy as np
 
+# Number of points of a quasi-Monte Carlo prior sequence (the limit of scipy's Sobol engine), split evenly among the
+# parallel workers
+QMC_SEQUENCE_LENGTH = 2 ** 30
+
 # The following variable stores n normalized distance values after n summary statistics have been calculated
 normalized_distances = None
 
@@ -48,18 +53,45 @@ class ABC(InferenceBase):
     """
     Approximate Bayesian Computation Rejection Sampler
 
+    With a 'screening_model' (a surrogate from sciope.models whose predict returns the mean and the standard
+    deviation in scaled units, e.g. GPRModel), the model is trained on the (parameter, distance) pairs of the
+    simulations performed so far, and retrained every 'retrain_every' simulations. Prior draws whose predicted lower
+    confidence bound mean - screening_kappa * std exceeds epsilon are skipped without simulating them. Acceptance is
+    still decided on simulated distances only. Simulated distances are noisy, so GP surrogates should be given a kernel
+    with a noise term (e.g. ConstantKernel() * RBF() + WhiteKernel()). After 'max_screened_in_a_row' consecutive
+    skipped draws the next draw is simulated anyway, so that sampling progresses and the model keeps being retrained
+    even if it (wrongly) predicts a rejection everywhere.
+
+    In parallel mode each process trains its own copy of the screening model. Models that start a process pool of
+    their own (GPRModel with n_jobs=None) are switched to n_jobs=1 there, to avoid starting cpu_count^2 processes.
+
     * InferenceBase.infer()
     """
 
     def __init__(self, data, sim, prior_function, epsilon=0.1, parallel_mode=True, summaries_function=bs.Burstiness(),
-                 distance_function=euc.EuclideanDistance()):
+                 distance_function=euc.EuclideanDistance(), screening_model=None, screening_start=50,
+                 retrain_every=50, screening_kappa=2.0, max_screened_in_a_row=100):
+        """
+        :param screening_model: untrained surrogate model used to screen prior draws, None simulates every draw
+        :param screening_start: number of simulations before the screening model is first trained
+        :param retrain_every: number of simulations between retraining the screening model
+        :param screening_kappa: number of standard deviations below the predicted distance of the lower confidence
+                                bound; larger values screen out fewer draws
+        :param max_screened_in_a_row: number of consecutive skipped draws after which a draw is simulated regardless
+        """
         self.name = 'ABC'
         self.epsilon = epsilon
         self.summaries_function = summaries_function
         self.prior_function = prior_function
         self.distance_function = distance_function
         self.parallel_mode = parallel_mode
+        self.screening_model = screening_model
+        self.screening_start = screening_start
+        self.retrain_every = retrain_every
+        self.screening_kappa = screening_kappa
+        self.max_screened_in_a_row = max_screened_in_a_row
         self.historical_distances = []
+        self.historical_parameters = []
         super(ABC, self).__init__(self.name, data, sim)
         logger.info("Approximate Bayesian Computation initialized")
 
@@ -80,6 +112,34 @@ class ABC(InferenceBase):
 
         return normalized_distances[-1, :]
 
+    def train_screening_model(self):
+        """
+        Train the screening model on all simulated parameters and their combined distances, scaled with respect to
+        the current historical maxima
+        :return: -
+        """
+        all_distances = np.array(self.historical_distances)
+        divisor = all_distances.max(axis=0)
+        divisor[divisor == 0] = 1
+        combined_distances = np.linalg.norm(all_distances / divisor, axis=1)
+        parameters = np.array(self.historical_parameters).reshape(len(combined_distances), -1)
+        self.screening_model.train(parameters, combined_distances.reshape(-1, 1))
+
+    def is_screened_out(self, trial_param):
+        """
+        True if the screening model confidently predicts that 'trial_param' will be rejected
+        :param trial_param: the prior draw
+        :return: bool
+        """
+        prediction = self.screening_model.predict(np.reshape(trial_param, (1, -1)))
+        if isinstance(prediction, tuple):
+            mean, std = prediction
+            # Surrogates return the standard deviation of the scaled targets
+            std = np.ravel(std)[0] * self.screening_model.sy
+        else:
+            mean, std = prediction, 0.0
+        return np.ravel(mean)[0] - self.screening_kappa * std > self.epsilon
+
     @sciope_profiler.profile
     def rejection_sampling(self, num_samples):
         """
@@ -89,9 +149,13 @@ class ABC(InferenceBase):
         distances: Accepted distance values
         accepted_count: Number of accepted samples
         trial_count: The number of total trials performed in order to converge
+        screened_count: The number of prior draws skipped by the screening model without simulating them
         """
         accepted_count = 0
         trial_count = 0
+        screened_count = 0
+        screening_trained_at = None
+        screened_in_a_row = 0
         accepted_samples = []
         distances = []
         fixed_dataset = DataSet('Fixed Data')
@@ -103,6 +167,19 @@ class ABC(InferenceBase):
             # Draw from the prior
             trial_param = self.prior_function.draw()
 
+            # Skip draws that the screening model predicts will be rejected
+            if self.screening_model is not None:
+                if trial_count >= self.screening_start and (screening_trained_at is None or
+                                                            trial_count - screening_trained_at >= self.retrain_every):
+                    self.train_screening_model()
+                    screening_trained_at = trial_count
+                if screening_trained_at is not None and screened_in_a_row < self.max_screened_in_a_row and \
+                        self.is_screened_out(trial_param):
+                    screened_count += 1
+                    screened_in_a_row += 1
+                    continue
+                screened_in_a_row = 0
+
             # Perform the trial
             sim_result = self.sim(trial_param)
 
@@ -117,6 +194,7 @@ class ABC(InferenceBase):
 
             # Normalize distances between [0,1]
             sim_dist_scaled = self.scale_distance(sim_dist)
+            self.historical_parameters.append(np.ravel(trial_param))
 
             # Take the norm to combine the distances
             combined_distance = np.linalg.norm(sim_dist_scaled)
@@ -134,17 +212,30 @@ class ABC(InferenceBase):
             trial_count += 1
 
         self.results = {'accepted_samples': accepted_samples, 'distances': distances, 'accepted_count': accepted_count,
-                   'trial_count': trial_count, 'inferred_parameters': np.mean(accepted_samples, axis=0)}
+                   'trial_count': trial_count, 'screened_count': screened_count,
+                   'inferred_parameters': np.mean(accepted_samples, axis=0)}
         return self.results
 
-    def perform_abc(self, num_samples, output):
+    def perform_abc(self, num_samples, output, worker_id=0, qmc_stride=QMC_SEQUENCE_LENGTH):
         """
-        Wrapper function for rejection sampling.
+        Wrapper function for rejection sampling. Results are passed back through shared memory, only a small handle
+        goes through the queue.
         :param num_samples: The desired number of accepted samples
         :param output: The multiprocessing output queue
+        :param worker_id: Index of the process, used to give each process its own part of a quasi-Monte Carlo prior
+        :param qmc_stride: Number of points of a quasi-Monte Carlo prior sequence reserved for each process
         :return:
         """
-        output.put(self.rejection_sampling(num_samples))
+        if hasattr(self.prior_function, 'for_worker'):
+            self.prior_function = self.prior_function.for_worker(worker_id, qmc_stride)
+        if getattr(self.screening_model, 'n_jobs', 1) is None:
+            # Every ABC process already runs on its own CPU
+            self.screening_model.n_jobs = 1
+        results = self.rejection_sampling(num_samples)
+        # Stack into arrays so that the data can be moved as a few shared memory blocks
+        results['accepted_samples'] = np.asarray(results['accepted_samples'])
+        results['distances'] = np.asarray(results['distances'])
+        output.put(smt.share(results))
 
     def process_queue_outputs(self, x):
         """
@@ -162,12 +253,15 @@ class ABC(InferenceBase):
 
         accepted_count = sum([p['accepted_count'] for p in x])
         trial_count = sum([p['trial_count'] for p in x])
+        screened_count = sum([p.get('screened_count', 0) for p in x])
 
         self.results = {'accepted_samples': flat_posteriors_list, 'distances': flat_distances_list,
                         'accepted_count': accepted_count, 'trial_count': trial_count,
+                        'screened_count': screened_count,
                         'inferred_parameters': np.mean(flat_posteriors_list, axis=0)}
         logger.info("\n\nInferred parameters: {0}".format(self.results['inferred_parameters']))
         logger.info("Trial count: {0}".format(self.results['trial_count']))
+        logger.info("Screened count: {0}".format(self.results['screened_count']))
         return self.results
 
     def infer(self, num_samples):
@@ -179,6 +273,7 @@ class ABC(InferenceBase):
         distances: Accepted distance values
         accepted_count: Number of accepted samples
         trial_count: The number of total trials performed in order to converge
+        screened_count: The number of prior draws skipped by the screening model
         """
         if not self.parallel_mode:
             # Serial ABC
@@ -188,14 +283,18 @@ class ABC(InferenceBase):
             proc_count = mp.cpu_count()
             chunks_count = np.ceil(num_samples / float(proc_count))
             logger.info("Parallel ABC: Running {0} samples on {1} processors...".format(chunks_count, proc_count))
+            # Split what is left of a quasi-Monte Carlo sequence among the processes
+            qmc_stride = (QMC_SEQUENCE_LENGTH - getattr(self.prior_function, 'skip', 0)) // proc_count
             output = mp.Queue()
-            processes = [ABCProcess(target=self.perform_abc, args=(chunks_count, output))
+            processes = [ABCProcess(target=self.perform_abc, args=(chunks_count, output, i, qmc_stride))
                          for i in range(proc_count)]
             for p in processes:
                 p.start()
 
+            # Collect before joining, a process does not exit until its queued data has been consumed
+            process_results = [smt.receive(output.get()) for p in processes]
+
             for p in processes:
                 p.join()
 
-            process_results = [output.get() for p in processes]
             return self.process_queue_outputs(process_results)
@@ -0,0 +1,229 @@
+# Copyright 2019 Prashant Singh, Fredrik Wrede and Andreas Hellander
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Bayesian Optimization for Likelihood-Free Inference (BOLFI)
+"""
+
+# Imports
+from sciope.inference.inference_base import InferenceBase
+from sciope.models.gp_regressor import GPRModel
+from sciope.utilities.distancefunctions import euclidean as euc
+from sciope.utilities.summarystats import burstiness as bs
+from sciope.utilities.housekeeping import sciope_logger as ml
+from sciope.utilities.housekeeping import sciope_profiler
+from sklearn.gaussian_process.kernels import ConstantKernel, RBF, WhiteKernel
+from scipy.linalg import solve_triangular
+from scipy.stats import norm
+import multiprocessing as mp
+import numpy as np
+
+# The simulator, set in each worker process by _init_worker
+_worker_sim = None
+
+# Set up the logger
+logger = ml.SciopeLogger().get_logger()
+
+
+def _init_worker(sim):
+    global _worker_sim
+    _worker_sim = sim
+
+
+def _simulate(param):
+    return _worker_sim(param)
+
+
+# Class definition: BOLFI
+class BOLFI(InferenceBase):
+    """
+    Likelihood-free inference for expensive simulators by Bayesian optimization of the discrepancy.
+
+    A Gaussian process (GPRModel) models the discrepancy between simulated and observed data, i.e. the norm of the
+    distances between their summary statistics, scaled to [0, 1] per statistic as in ABC, as a function of the
+    parameters. After 'n_initial' prior draws, batches of 'batch_size' parameters are simulated where the lower
+    confidence bound mean - exploration * std of the discrepancy is smallest, which concentrates the simulations
+    where the discrepancy is likely small. The points of a batch are selected one after the other: the GP variance is
+    conditioned on the points selected so far (their outcome does not change the mean), so the batch spreads out and
+    can be simulated by parallel workers.
+
+    The approximate likelihood of parameters is the probability that their discrepancy is below a threshold epsilon
+    under the GP, Phi((epsilon - mean) / std). The posterior is sampled by resampling prior draws weighted by it.
+
+    Key reference:
+    Gutmann, Michael U., and Jukka Corander.
+    "Bayesian optimization for likelihood-free inference of simulator-based statistical models."
+    The Journal of Machine Learning Research 17.1 (2016): 4256-4302.
+
+    * InferenceBase.infer()
+    """
+
+    def __init__(self, data, sim, prior_function, summaries_function=bs.Burstiness(),
+                 distance_function=euc.EuclideanDistance(), model=None, n_initial=20, batch_size=1, n_jobs=1,
+                 exploration=2.0, candidates_ratio=10, min_candidates=1000):
+        """
+        :param data: the observed data
+        :param sim: the simulator, called with a 1 x d array of parameters
+        :param prior_function: the prior, drawing n x d arrays of parameters
+        :param summaries_function: summary statistics of the (observed or simulated) data
+        :param distance_function: distance between the summary statistics
+        :param model: untrained GPRModel of the discrepancy, defaults to a GP with an ARD RBF and a noise kernel
+        :param n_initial: number of prior draws simulated before the acquisition starts
+        :param batch_size: number of parameters acquired, and simulated, at once
+        :param n_jobs: number of worker processes simulating a batch; 1 simulates in-process
+        :param exploration: weight of the GP standard deviation in the lower confidence bound
+        :param candidates_ratio: number of prior draws searched by the acquisition per simulated and requested point
+        :param min_candidates: minimum number of prior draws searched by the acquisition
+        """
+        self.name = 'BOLFI'
+        self.prior_function = prior_function
+        self.summaries_function = summaries_function
+        self.distance_function = distance_function
+        self.model = model
+        self.n_initial = n_initial
+        self.batch_size = batch_size
+        self.n_jobs = n_jobs
+        self.exploration = exploration
+        self.candidates_ratio = candidates_ratio
+        self.min_candidates = min_candidates
+        self.parameters = []
+        self.distances = []
+        super(BOLFI, self).__init__(self.name, data, sim)
+        logger.info("Bayesian Optimization for Likelihood-Free Inference initialized")
+
+    def simulate(self, params):
+        """
+        Simulate a batch of parameters, in parallel if n_jobs > 1, and record their distances to the data
+        :param params: n x d array of parameters
+        :return: -
+        """
+        params = [np.reshape(param, (1, -1)) for param in params]
+        if self.n_jobs == 1 or len(params) == 1:
+            sim_results = [self.sim(param) for param in params]
+        else:
+            pool = mp.Pool(min(self.n_jobs, len(params)), initializer=_init_worker, initargs=(self.sim,))
+            try:
+                sim_results = pool.map(_simulate, params)
+            finally:
+                pool.close()
+                pool.join()
+
+        for param, sim_result in zip(params, sim_results):
+            sim_stats = self.summaries_function.compute(sim_result)
+            sim_dist = self.distance_function.compute(self.fixed_stats, sim_stats)
+            self.parameters.append(param.ravel())
+            self.distances.append(np.asarray(sim_dist).ravel())
+            logger.debug("BOLFI: parameter = [{0}], distance = [{1}]".format(param, sim_dist))
+
+    def discrepancies(self):
+        """
+        The discrepancies of all simulations: norms of their distances, scaled to [0,1] per summary statistic with
+        respect to the largest distance simulated so far
+        :return: vector of discrepancies
+        """
+        all_distances = np.array(self.distances)
+        divisor = all_distances.max(axis=0)
+        divisor[divisor == 0] = 1
+        return np.linalg.norm(all_distances / divisor, axis=1)
+
+    def fit(self):
+        """
+        Train the GP on the discrepancies of all simulations
+        :return: -
+        """
+        if self.model is None:
+            num_dimensions = len(self.parameters[0])
+            kernel = ConstantKernel() * RBF(np.ones(num_dimensions)) + WhiteKernel(1e-2)
+            self.model = GPRModel(kernel=kernel, n_restarts=5, n_jobs=1)
+        self.model.train(np.array(self.parameters), self.discrepancies().reshape(-1, 1))
+
+    def acquire(self, n):
+        """
+        Select a batch of 'n' parameters minimizing the lower confidence bound of the discrepancy among prior draws.
+        After each selection, the GP variance at the candidates is conditioned on the selected point.
+        :param n: the batch size
+        :return: n x d array of parameters
+        """
+        num_candidates = max(self.candidates_ratio * (len(self.parameters) + n), self.min_candidates, n)
+        c = self.prior_function.draw(num_candidates)
+
+        # Posterior mean and covariance of the GP on the scaled discrepancies, the selection does not depend on scale
+        gp = self.model.model
+        mean = gp.predict(c)
+        v = solve_triangular(gp.L_, gp.kernel_(gp.X_train_, c), lower=True)
+        variance = np.maximum(gp.kernel_.diag(c) - np.sum(v ** 2, axis=0), 0)
+
+        selected = []
+        for i in range(n):
+            acquisition = mean - self.exploration * np.sqrt(variance)
+            acquisition[selected] = np.inf
+            idx = np.argmin(acquisition)
+            selected.append(idx)
+            # Condition the variance on a (pending) observation at the selected point
+            covariance = gp.kernel_(c, c[idx:idx + 1]).ravel() - v.T.dot(v[:, idx])
+            variance = np.maximum(variance - covariance ** 2 / (variance[idx] + gp.alpha), 0)
+        return c[selected]
+
+    def posterior(self, num_samples, epsilon=None, num_proposals=None):
+        """
+        Sample the approximate posterior by resampling prior draws with weights proportional to the approximate
+        likelihood Phi((epsilon - mean) / std) of the GP
+        :param num_samples: number of posterior samples
+        :param epsilon: discrepancy threshold, defaults to the smallest GP mean at the simulated parameters
+        :param num_proposals: number of prior draws, defaults to 10 * num_samples
+        :return: num_samples x d array of samples, the threshold and the normalized weights of the prior draws
+        """
+        if epsilon is None:
+            epsilon = np.min(self.model.predict(np.array(self.parameters))[0])
+        proposals = self.prior_function.draw(num_proposals or 10 * num_samples)
+        mean, sigma = self.model.predict(proposals)
+        # Surrogates return the standard deviation of the scaled targets
+        sigma = np.maximum(np.ravel(sigma) * self.model.sy, np.finfo(float).tiny)
+        weights = norm.cdf((epsilon - mean.ravel()) / sigma)
+        weights /= weights.sum()
+        samples = proposals[np.random.choice(len(proposals), num_samples, p=weights)]
+        return samples, epsilon, weights
+
+    @sciope_profiler.profile
+    def infer(self, num_simulations, num_samples=1000):
+        """
+        Perform BOLFI inference according to initialized configuration.
+        :param num_simulations: total number of simulations
+        :param num_samples: number of approximate posterior samples
+        :return:
+        accepted_samples: Samples of the approximate posterior
+        inferred_parameters: Their mean
+        epsilon: The discrepancy threshold of the approximate likelihood
+        parameters: The simulated parameters
+        discrepancies: Their discrepancies
+        trial_count: The number of simulations
+        """
+        self.fixed_stats = self.summaries_function.compute(self.data)
+        num_initial = max(min(self.n_initial, num_simulations) - len(self.parameters), 0)
+        if num_initial > 0:
+            self.simulate(self.prior_function.draw(num_initial))
+
+        while len(self.parameters) < num_simulations:
+            self.fit()
+            batch_size = min(self.batch_size, num_simulations - len(self.parameters))
+            self.simulate(self.acquire(batch_size))
+            logger.info("BOLFI: {0} simulations, smallest discrepancy = {1}".format(len(self.parameters),
+                                                                                    np.min(self.discrepancies())))
+        self.fit()
+
+        samples, epsilon, weights = self.posterior(num_samples)
+        self.results = {'accepted_samples': samples, 'inferred_parameters': np.mean(samples, axis=0),
+                        'epsilon': epsilon, 'parameters': np.array(self.parameters),
+                        'discrepancies': self.discrepancies(), 'trial_count': len(self.parameters)}
+        logger.info("\n\nInferred parameters: {0}".format(self.results['inferred_parameters']))
+        return self.results
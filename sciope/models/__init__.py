@@ -1 +1 @@
-__all__ = ["ann_regressor", "gp_regressor", "model_base", "svm_regressor"]
\ No newline at end of file
+__all__ = ["ann_regressor", "gp_regressor", "model_base", "sparse_gp_regressor", "svm_regressor"]
\ No newline at end of file
@@ -18,16 +18,64 @@ Artificial Neural Network (ANN) Regression Surrogate Model
 # Imports
 from sciope.models.model_base import ModelBase
 from sklearn.neural_network import MLPRegressor
+import numpy as np
 
 
 # Class definition
 class ANNModel(ModelBase):
     """
     We use the sklearn MLP Regressor implementation here.
+
+    By default, the network is trained with L-BFGS on the full dataset. With solver='adam', it is trained on
+    mini-batches for at most 'max_iter' epochs, optionally stopping once the loss on a held-out validation fraction
+    has not improved for 'n_iter_no_change' epochs, so training time scales with epochs x data. 'train_dataset'
+    streams mini-batches from a (possibly memory-mapped) DataSet instead of holding the training data in memory.
+
+    'update' continues training from the current weights on all data instead of from a random initialization.
     """
 
-    def __init__(self):
+    def __init__(self, hidden_layer_sizes=(200, 2), activation='logistic', solver='lbfgs', alpha=1e-5, max_iter=None,
+                 batch_size=200, learning_rate_init=1e-3, early_stopping=False, validation_fraction=0.1,
+                 n_iter_no_change=10, tol=1e-4):
+        """
+        :param hidden_layer_sizes: number of neurons of each hidden layer
+        :param activation: activation function of the hidden layers, e.g. 'logistic', 'tanh' or 'relu'
+        :param solver: 'lbfgs' (full batch) or 'adam' (mini-batches)
+        :param alpha: L2 regularization strength
+        :param max_iter: maximum number of iterations for 'lbfgs', or of epochs for 'adam'; defaults to 50000 and 200
+        :param batch_size: mini-batch size for 'adam'
+        :param learning_rate_init: initial learning rate for 'adam'
+        :param early_stopping: stop 'adam' training when the validation loss stops improving
+        :param validation_fraction: fraction of the training data held out for early stopping
+        :param n_iter_no_change: number of epochs without an improvement of at least 'tol' before stopping
+        :param tol: minimum improvement of the loss
+        """
+        if solver not in ('lbfgs', 'adam'):
+            raise ValueError("Supported solvers are 'lbfgs' and 'adam', got {0}".format(solver))
         self.name = 'ANNModel'
+        self.hidden_layer_sizes = tuple(hidden_layer_sizes)
+        self.activation = activation
+        self.solver = solver
+        self.alpha = alpha
+        if max_iter is None:
+            max_iter = 50000 if solver == 'lbfgs' else 200
+        self.max_iter = max_iter
+        self.batch_size = batch_size
+        self.learning_rate_init = learning_rate_init
+        self.early_stopping = early_stopping
+        self.validation_fraction = validation_fraction
+        self.n_iter_no_change = n_iter_no_change
+        self.tol = tol
+
+    def _estimator(self):
+        """
+        The (untrained) regressor
+        """
+        return MLPRegressor(solver=self.solver, alpha=self.alpha, hidden_layer_sizes=self.hidden_layer_sizes,
+                            max_iter=self.max_iter, learning_rate='adaptive', activation=self.activation,
+                            batch_size=self.batch_size, learning_rate_init=self.learning_rate_init,
+                            early_stopping=self.early_stopping, validation_fraction=self.validation_fraction,
+                            n_iter_no_change=self.n_iter_no_change, tol=self.tol)
 
     # train the ANN model given the data
     def train(self, inputs, targets):
@@ -35,8 +83,93 @@ class ANNModel(ModelBase):
         self.scale_training_data(inputs, targets)
 
         # Train the model
-        self.model = MLPRegressor(solver='lbfgs', alpha=1e-5, hidden_layer_sizes=(200, 2), max_iter=50000,
-                                  learning_rate='adaptive', activation='logistic')
+        self.model = self._estimator()
+        self.model.fit(self.x, self.y)
+
+    # train the ANN model on mini-batches streamed from a dataset
+    def train_dataset(self, dataset, inputs='x', targets='y', chunk_size=100000):
+        """
+        Train with 'adam' on mini-batches read from the arrays of 'dataset', which may be memory-mapped (DataSet.load).
+        Each epoch visits contiguous chunks of 'chunk_size' rows in random order and shuffles the rows within a
+        chunk, so at most one chunk is held in memory. The training data is not kept: 'self.x' references the
+        dataset inputs and 'self.y' is None, so the model cannot be updated.
+        :param dataset: the DataSet
+        :param inputs: name of the dataset attribute holding the inputs
+        :param targets: name of the dataset attribute holding the targets
+        :param chunk_size: number of rows read at once
+        :return: -
+        """
+        if self.solver != 'adam':
+            raise ValueError("Training from a dataset requires solver='adam'")
+        x = getattr(dataset, inputs)
+        y = getattr(dataset, targets)
+        n = x.shape[0]
+
+        # Scaling of the targets, accumulated over chunks
+        total, total_squares, count = 0.0, 0.0, 0
+        for start in range(0, n, chunk_size):
+            chunk = np.real(np.asarray(y[start:start + chunk_size], dtype=float))
+            chunk = chunk[~np.isnan(chunk)]
+            total += chunk.sum()
+            total_squares += np.sum(chunk ** 2)
+            count += chunk.size
+        self.my = total / count
+        self.sy = np.sqrt(max(total_squares / count - self.my ** 2, 0))
+        self.x = x
+        self.y = None
+        self.n = n
+
+        # Held-out validation rows, read into memory once
+        is_validation = np.zeros(n, dtype=bool)
+        if self.early_stopping:
+            is_validation[np.random.choice(n, max(1, int(self.validation_fraction * n)), replace=False)] = True
+            x_validation = np.asarray(x[is_validation], dtype=float)
+            y_validation = self.scale_targets(y[is_validation])
+
+        # Early stopping is done here, on the held-out rows, sklearn only supports it for full-data fits
+        self.model = self._estimator()
+        self.model.set_params(shuffle=True, early_stopping=False)
+        best_loss, best_weights, epochs_no_change = np.inf, None, 0
+        starts = np.arange(0, n, chunk_size)
+        for self.n_epochs_ in range(1, self.max_iter + 1):
+            training_loss = 0.0
+            for start in np.random.permutation(starts):
+                training = ~is_validation[start:start + chunk_size]
+                x_chunk = np.asarray(x[start:start + chunk_size], dtype=float)[training]
+                y_chunk = self.scale_targets(y[start:start + chunk_size])[training]
+                if x_chunk.shape[0] > 0:
+                    self.model.partial_fit(x_chunk, y_chunk)
+                    training_loss += self.model.loss_ * x_chunk.shape[0]
+
+            if self.early_stopping:
+                loss = np.mean((self.model.predict(x_validation) - y_validation) ** 2) / 2
+            else:
+                loss = training_loss / np.count_nonzero(~is_validation)
+            if loss < best_loss - self.tol:
+                best_loss, epochs_no_change = loss, 0
+                if self.early_stopping:
+                    best_weights = ([w.copy() for w in self.model.coefs_], [b.copy() for b in self.model.intercepts_])
+            else:
+                epochs_no_change += 1
+                if epochs_no_change >= self.n_iter_no_change:
+                    break
+
+        # Keep the weights with the best validation loss
+        if best_weights is not None:
+            self.model.coefs_, self.model.intercepts_ = best_weights
+        self.best_loss_ = best_loss
+
+    # Add training data to the trained ANN model
+    def update(self, new_x, new_y):
+        if self.y is None:
+            raise ValueError("Cannot update a model trained with train_dataset, which does not keep the training "
+                             "data; add the points to the dataset and call train_dataset again")
+        self.x = np.vstack((self.x, new_x))
+        self.y = np.concatenate((self.y, self.scale_targets(new_y)))
+        self.n = self.x.shape[0]
+
+        # Warm start from the current weights
+        self.model.set_params(warm_start=True)
         self.model.fit(self.x, self.y)
 
     # Predict
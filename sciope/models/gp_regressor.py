@@ -18,26 +18,169 @@ Gaussian Process Regression Surrogate Model using sklearn
 # Imports
 from sciope.models.model_base import ModelBase
 from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import ConstantKernel, RBF
+from scipy.optimize import minimize
+from scipy.linalg import cho_solve, solve_triangular
+import multiprocessing as mp
+import numpy as np
+import time
+
+# The GP conditioned on the training data, set in each worker process by _init_worker
+_worker_gp = None
+
+
+def _init_worker(gp):
+    global _worker_gp
+    _worker_gp = gp
+
+
+def _optimize_restart(theta):
+    """
+    Maximize the log marginal likelihood of the worker's GP by L-BFGS-B from the (log-transformed) hyperparameters
+    'theta'
+    :return: the optimized hyperparameters and their log marginal likelihood
+    """
+    def objective(t):
+        lml, gradient = _worker_gp.log_marginal_likelihood(t, eval_gradient=True, clone_kernel=False)
+        return -lml, -gradient
+
+    result = minimize(objective, theta, method='L-BFGS-B', jac=True, bounds=_worker_gp.kernel_.bounds)
+    return result.x, -result.fun
 
 
 # Class definition
 class GPRModel(ModelBase):
     """
     We use the sklearn GP Regressor implementation here.
+
+    The kernel hyperparameters maximize the log marginal likelihood over several optimizer restarts, which can run in
+    parallel on a process pool ('n_jobs'). The restarts stop when the budget ('max_time' seconds) is spent or when the
+    best likelihood has not improved for 'patience' restarts. When trained again, e.g. on grown data, the previous
+    optimum is the first starting point.
+
+    New data can be added with 'update', which extends the Cholesky factor of the training covariance by the new rows
+    in O(n^2 k) instead of refactorizing it in O(n^3), keeping the hyperparameters.
     """
 
-    def __init__(self):
+    def __init__(self, kernel=None, n_restarts=100, n_jobs=1, max_time=None, patience=None, tol=1e-4,
+                 warm_start=True):
+        """
+        :param kernel: sklearn kernel, defaults to ConstantKernel * RBF with tunable hyperparameters
+        :param n_restarts: number of restarts from random hyperparameters, besides the initial ones
+        :param n_jobs: number of worker processes, None for the number of CPUs; 1 runs the restarts in-process, which
+                       avoids starting a pool for each small refit, e.g. when the model is retrained in a loop
+        :param max_time: wall-clock budget of the restarts in seconds, unlimited if None
+        :param patience: stop after this many restarts without improving the best likelihood by 'tol', never if None
+        :param tol: minimum improvement of the log marginal likelihood that resets the patience
+        :param warm_start: start from the hyperparameters of the previous train call
+        """
         self.name = 'GPRModel'
+        self.kernel = kernel
+        self.n_restarts = n_restarts
+        self.n_jobs = n_jobs
+        self.max_time = max_time
+        self.patience = patience
+        self.tol = tol
+        self.warm_start = warm_start
+        self.kernel_ = None
+
+    def _initial_kernel(self):
+        kernel = self.kernel if self.kernel is not None else ConstantKernel(1.0) * RBF(1.0)
+        if self.warm_start and self.kernel_ is not None and self.kernel_.n_dims == kernel.n_dims:
+            return self.kernel_
+        return kernel
+
+    def _random_starts(self, bounds):
+        for i in range(self.n_restarts):
+            yield np.random.uniform(bounds[:, 0], bounds[:, 1])
+
+    def optimize_hyperparameters(self, kernel):
+        """
+        Optimize the hyperparameters from those of 'kernel', then run the optimizer restarts from random ones
+        :param kernel: kernel whose hyperparameters are the first starting point
+        :return: the kernel with the best hyperparameters found
+        """
+        if kernel.n_dims == 0:
+            return kernel
+        gp = GaussianProcessRegressor(kernel=kernel, optimizer=None)
+        gp.fit(self.x, self.y)
+        start_time = time.time()
+
+        # The first (warm) start runs in-process, so that its result is available whatever the budget
+        _init_worker(gp)
+        best_theta, best_lml = _optimize_restart(kernel.theta)
+        _init_worker(None)
+        if self.n_restarts == 0:
+            return kernel.clone_with_theta(best_theta)
+
+        n_jobs = self.n_jobs or mp.cpu_count()
+        starts = self._random_starts(kernel.bounds)
+        pool = None
+        if n_jobs > 1:
+            pool = mp.Pool(n_jobs, initializer=_init_worker, initargs=(gp,))
+            results = pool.imap_unordered(_optimize_restart, starts)
+        else:
+            _init_worker(gp)
+            results = (_optimize_restart(theta) for theta in starts)
+
+        since_improvement = 0
+        try:
+            for theta, lml in results:
+                if lml > best_lml + self.tol:
+                    since_improvement = 0
+                else:
+                    since_improvement += 1
+                if lml > best_lml:
+                    best_theta, best_lml = theta, lml
+                if self.max_time is not None and time.time() - start_time > self.max_time:
+                    break
+                if self.patience is not None and since_improvement >= self.patience:
+                    break
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            _init_worker(None)
+        return kernel.clone_with_theta(best_theta)
 
     # train the GP model given the data
     def train(self, inputs, targets):
         # Scale the training data
         self.scale_training_data(inputs, targets)
 
+        # Tune the kernel hyperparameters
+        self.kernel_ = self.optimize_hyperparameters(self._initial_kernel())
+
         # Train the model
-        self.model = GaussianProcessRegressor(n_restarts_optimizer=100)
+        self.model = GaussianProcessRegressor(kernel=self.kernel_, optimizer=None)
         self.model.fit(self.x, self.y)
 
+    # Add training data to the trained GP model
+    def update(self, new_x, new_y):
+        gp = self.model
+        new_x = np.asarray(new_x, dtype=float)
+        new_y = self.scale_targets(new_y)
+
+        # Block Cholesky update: [[L, 0], [B, C]] with B = K_new,old L^-T and C C^T = K_new,new - B B^T
+        cross = gp.kernel_(gp.X_train_, new_x)
+        block = solve_triangular(gp.L_, cross, lower=True).T
+        corner = gp.kernel_(new_x) + np.eye(new_x.shape[0]) * gp.alpha - block.dot(block.T)
+        n = gp.L_.shape[0]
+        k = new_x.shape[0]
+        chol = np.zeros((n + k, n + k))
+        chol[:n, :n] = gp.L_
+        chol[n:, :n] = block
+        chol[n:, n:] = np.linalg.cholesky(corner)
+
+        gp.X_train_ = np.vstack((gp.X_train_, new_x))
+        gp.y_train_ = np.concatenate((gp.y_train_, new_y))
+        gp.L_ = chol
+        gp.alpha_ = cho_solve((chol, True), gp.y_train_)
+
+        self.x = np.vstack((self.x, new_x))
+        self.y = np.concatenate((self.y, new_y))
+        self.n = self.x.shape[0]
+
     # Predict
     # * NOTE *
     # GP returns the mean and variance of prediction, so handle it accordingly while using predict
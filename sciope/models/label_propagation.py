@@ -17,9 +17,13 @@ Semi-supervised Label Propagation Surrogate Model
 
 # Imports
 from sciope.models.model_base import ModelBase
-from sklearn.semi_supervised import label_propagation
+from sciope.data.spatial_index import SpatialIndex
+from sklearn.semi_supervised import LabelSpreading
+from sklearn.metrics.pairwise import rbf_kernel, euclidean_distances
+from sklearn.kernel_approximation import Nystroem
 from scipy.optimize import basinhopping
 from scipy.stats.distributions import entropy
+from scipy import sparse
 import numpy as np
 
 
@@ -59,18 +63,303 @@ class RandomDisplacementBounds(object):
         return xnew
 
 
+class CachedRBFKernel(object):
+    """
+    RBF kernel for LabelSpreading that keeps the squared pairwise distances among the training inputs, so that
+    changing gamma (e.g. while tuning it) only redoes the exponentiation, and that can extend the distances with new
+    inputs without recomputing them.
+
+    With 'n_neighbors', the affinities are restricted to a sparse (symmetrized) k-nearest neighbour graph with RBF
+    weights, which takes O(n k) memory instead of O(n^2) and scales to datasets where the dense matrix does not fit.
+    The graph is extended incrementally: new inputs are linked to their nearest neighbours, while the edges among
+    previous inputs are kept.
+    """
+    def __init__(self, gamma, x, n_neighbors=None):
+        self.gamma = gamma
+        self.x = np.asarray(x, dtype=float)
+        self.n_neighbors = n_neighbors
+        self.affinity = None
+        self._build()
+
+    def _build(self):
+        if self.n_neighbors is None:
+            self.squared_distances = euclidean_distances(self.x, squared=True)
+        else:
+            self.index = SpatialIndex(self.x)
+            graph = self._neighbour_graph(self.index, self.x, offset=0)
+            # Symmetrize the pattern: i and j are connected if either is among the neighbours of the other
+            graph = (graph + graph.T).tocoo()
+            self.squared_distances = self._edge_distances(self.x, self.x, graph.row, graph.col, graph.shape)
+        self.set_gamma(self.gamma)
+
+    def _neighbour_graph(self, index, points, offset=None):
+        """
+        Sparse len(points) x index.size connectivity pattern of the nearest indexed neighbours of each point. If the
+        points are indexed themselves, starting at row 'offset', each point is left out of its own neighbours.
+        """
+        k = min(self.n_neighbors + int(offset is not None), index.size)
+        distances, neighbours = index.knn(points, k=k)
+        rows = np.repeat(np.arange(points.shape[0]), k)
+        neighbours = neighbours.ravel()
+        if offset is not None:
+            keep = neighbours != rows + offset
+            rows, neighbours = rows[keep], neighbours[keep]
+        return sparse.csr_matrix((np.ones(len(rows)), (rows, neighbours)), shape=(points.shape[0], index.size))
+
+    @staticmethod
+    def _edge_distances(a, b, rows, cols, shape):
+        """
+        Sparse matrix of the squared distances between a[rows] and b[cols]. Distances of zero are stored explicitly,
+        so that coinciding points stay connected.
+        """
+        squared_distances = np.sum((a[rows] - b[cols]) ** 2, axis=1)
+        return sparse.csr_matrix((squared_distances, (rows, cols)), shape=shape)
+
+    def _exponentiate(self, squared_distances):
+        if sparse.issparse(squared_distances):
+            affinity = squared_distances.copy()
+            affinity.data = np.exp(-self.gamma * affinity.data)
+            return affinity
+        return np.exp(-self.gamma * squared_distances)
+
+    def set_gamma(self, gamma):
+        """
+        Recompute the affinities among the training inputs for a new 'gamma' from the cached distances
+        """
+        self.gamma = float(gamma)
+        if self.n_neighbors is None and self.affinity is not None:
+            # Reuse the dense buffer
+            np.multiply(self.squared_distances, -self.gamma, out=self.affinity)
+            np.exp(self.affinity, out=self.affinity)
+        else:
+            self.affinity = self._exponentiate(self.squared_distances)
+
+    def extend(self, new_x):
+        """
+        Append 'new_x' to the training inputs, computing only the distances that involve them. In the neighbour graph,
+        the new inputs are connected (both ways) to their nearest neighbours among all inputs.
+        """
+        new_x = np.asarray(new_x, dtype=float)
+        n = self.x.shape[0]
+        if self.n_neighbors is not None:
+            self.x = np.vstack((self.x, new_x))
+            self.index.update(self.x)
+            size = self.x.shape[0]
+            graph = self._neighbour_graph(self.index, new_x, offset=n).tocoo()
+            graph = sparse.coo_matrix((graph.data, (graph.row + n, graph.col)), shape=(size, size))
+            graph = (graph + graph.T).tocoo()
+            previous = self.squared_distances.tocoo()
+            rows = np.concatenate((previous.row, graph.row))
+            cols = np.concatenate((previous.col, graph.col))
+            distances = np.concatenate((previous.data, np.sum((self.x[graph.row] - self.x[graph.col]) ** 2, axis=1)))
+            self.squared_distances = sparse.csr_matrix((distances, (rows, cols)), shape=(size, size))
+            self.set_gamma(self.gamma)
+            return
+        squared_distances = np.empty((n + new_x.shape[0], n + new_x.shape[0]))
+        squared_distances[:n, :n] = self.squared_distances
+        squared_distances[:n, n:] = euclidean_distances(self.x, new_x, squared=True)
+        squared_distances[n:, :n] = squared_distances[:n, n:].T
+        squared_distances[n:, n:] = euclidean_distances(new_x, squared=True)
+        self.x = np.vstack((self.x, new_x))
+        self.squared_distances = squared_distances
+        self.affinity = None
+        self.set_gamma(self.gamma)
+
+    def __call__(self, a, b):
+        if a.shape == self.x.shape and b.shape == self.x.shape and np.array_equal(a, self.x) and \
+                np.array_equal(b, self.x):
+            return self.affinity
+        if self.n_neighbors is None:
+            return rbf_kernel(a, b, gamma=self.gamma)
+        # Weights of the points in 'b' to their nearest neighbours in 'a', as an a x b matrix
+        index = self.index if a is self.x or np.array_equal(a, self.x) else SpatialIndex(a)
+        graph = self._neighbour_graph(index, b).tocoo()
+        squared_distances = self._edge_distances(b, a, graph.row, graph.col, graph.shape)
+        return self._exponentiate(squared_distances).T.tocsr()
+
+
+class NystroemLabelSpreading(object):
+    """
+    Label spreading on the RBF affinity graph approximated by Nystroem features, W ~ F F^T with F of size
+    n x n_components. Products with the normalized graph are computed through the features, so fitting costs
+    O(n n_components) per iteration and memory, instead of O(n^2). Mirrors the sklearn LabelSpreading interface.
+    """
+    def __init__(self, gamma=20, alpha=0.2, n_components=300, max_iter=30, tol=1e-3, random_state=None):
+        self.gamma = gamma
+        self.alpha = alpha
+        self.n_components = n_components
+        self.max_iter = max_iter
+        self.tol = tol
+        self.random_state = random_state
+
+    def _propagate(self, distributions):
+        # D^-1/2 (W - diag(W)) D^-1/2 times the label distributions, without forming W
+        scaled = distributions * self.inv_sqrt_degrees[:, None]
+        spread = self.features_.dot(self.features_.T.dot(scaled)) - self.self_affinities[:, None] * scaled
+        return spread * self.inv_sqrt_degrees[:, None]
+
+    def fit(self, X, y):
+        y = np.asarray(y)
+        self.nystroem = Nystroem(kernel='rbf', gamma=self.gamma, n_components=min(self.n_components, X.shape[0]),
+                                 random_state=self.random_state)
+        self.features_ = self.nystroem.fit_transform(X)
+        self.self_affinities = np.sum(self.features_ ** 2, axis=1)
+        degrees = self.features_.dot(self.features_.sum(axis=0)) - self.self_affinities
+        self.inv_sqrt_degrees = 1.0 / np.sqrt(np.maximum(degrees, np.finfo(float).tiny))
+
+        self.classes_ = np.unique(y[y != -1])
+        static = (y[:, None] == self.classes_[None, :]).astype(float)
+        distributions = static.copy()
+        static *= 1 - self.alpha
+        for self.n_iter_ in range(1, self.max_iter + 1):
+            previous = distributions
+            distributions = self.alpha * self._propagate(distributions) + static
+            if np.abs(distributions - previous).sum() < self.tol:
+                break
+
+        distributions = np.maximum(distributions, 0)
+        normalizer = distributions.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0] = 1
+        self.label_distributions_ = distributions / normalizer
+        self.transduction_ = self.classes_[np.argmax(self.label_distributions_, axis=1)]
+        return self
+
+    def predict_proba(self, X):
+        weights = self.nystroem.transform(X).dot(self.features_.T.dot(self.label_distributions_))
+        probabilities = np.maximum(weights, 0)
+        normalizer = probabilities.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0] = 1
+        return probabilities / normalizer
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def normalized_graph(affinity):
+    """
+    The label spreading graph D^-1/2 W D^-1/2 of a (dense or sparse) affinity matrix W, with its diagonal ignored
+    """
+    if sparse.issparse(affinity):
+        affinity = sparse.csr_matrix(affinity)
+        affinity = affinity - sparse.diags(affinity.diagonal())
+        degrees = np.asarray(affinity.sum(axis=1)).ravel()
+    else:
+        affinity = affinity.copy()
+        np.fill_diagonal(affinity, 0)
+        degrees = affinity.sum(axis=1)
+    inv_sqrt_degrees = np.zeros_like(degrees)
+    inv_sqrt_degrees[degrees > 0] = 1.0 / np.sqrt(degrees[degrees > 0])
+    if sparse.issparse(affinity):
+        scaling = sparse.diags(inv_sqrt_degrees)
+        return (scaling @ affinity @ scaling).tocsr()
+    return inv_sqrt_degrees[:, None] * affinity * inv_sqrt_degrees[None, :]
+
+
+class WarmLabelSpreading(object):
+    """
+    Label spreading (as sklearn LabelSpreading, with a callable kernel) that can start the iterations from given
+    label distributions. After a few labels or points are added to a converged state, a few warm-started iterations
+    bring the distributions close to the new fixed point, instead of propagating from scratch.
+    """
+    def __init__(self, kernel, alpha=0.2, max_iter=30, tol=1e-3):
+        self.kernel = kernel
+        self.alpha = alpha
+        self.max_iter = max_iter
+        self.tol = tol
+
+    def fit(self, X, y, distributions=None, classes=None):
+        """
+        :param X: training inputs
+        :param y: labels, -1 for unlabeled inputs
+        :param distributions: unnormalized label distributions to start from (n x number of classes), e.g. the
+            'distributions_' of a previous fit; defaults to the one-hot labels
+        :param classes: the classes matching the columns of 'distributions'; new classes in 'y' are appended
+        :return: self
+        """
+        y = np.asarray(y)
+        self.X_ = X
+        labeled_classes = np.unique(y[y != -1])
+        if classes is None:
+            self.classes_ = labeled_classes
+        else:
+            self.classes_ = np.concatenate((classes, np.setdiff1d(labeled_classes, classes)))
+        static = (y[:, None] == self.classes_[None, :]).astype(float)
+        if distributions is None:
+            distributions = static.copy()
+        else:
+            # Pad the previous state with the labels of new inputs and with columns for new classes
+            previous = distributions
+            distributions = static.copy()
+            distributions[:previous.shape[0], :previous.shape[1]] = previous
+        static *= 1 - self.alpha
+
+        graph = normalized_graph(self.kernel(X, X))
+        self.n_iter_ = 0
+        for self.n_iter_ in range(1, self.max_iter + 1):
+            previous = distributions
+            distributions = self.alpha * (graph @ distributions) + static
+            if np.abs(distributions - previous).sum() < self.tol:
+                break
+
+        self.distributions_ = distributions
+        normalizer = distributions.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0] = 1
+        self.label_distributions_ = distributions / normalizer
+        self.transduction_ = self.classes_[np.argmax(self.label_distributions_, axis=1)]
+        return self
+
+    def predict_proba(self, X):
+        weights = self.kernel(self.X_, X).T
+        probabilities = np.asarray(weights @ self.label_distributions_)
+        normalizer = probabilities.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0] = 1
+        return probabilities / normalizer
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
 # Class definition
 class LPModel(ModelBase):
     """
     We use the sklearn Label Spreading implementation here.
+
+    With the RBF kernel, the squared distances among the training inputs are computed once: tuning gamma only redoes
+    the exponentiation and the propagation, and 'update' only computes the distances of the new inputs. Setting
+    'n_neighbors' restricts the RBF affinities to a sparse k-nearest neighbour graph, for datasets where the dense
+    n x n matrix does not fit. For interactive labeling, 'relabel' and 'update(..., warm_start=True)' continue the
+    propagation from the current label distributions for a few iterations. With approximation='nystroem', labels are
+    spread on a low-rank (Nystroem) approximation of the RBF affinity graph instead, which scales linearly with the
+    number of points. The Nystroem components are then kept fixed while gamma is tuned and for the final fit, so that
+    the objective is a deterministic function of gamma; 'random_state' seeds them, a random seed is drawn when it is
+    None.
     """
 
-    def __init__(self, kernel='rbf', alpha=0.7, gamma=0.1, learning_rate=1.0):
+    def __init__(self, kernel='rbf', alpha=0.7, gamma=0.1, learning_rate=1.0, approximation=None, n_components=300,
+                 n_neighbors=None, random_state=None):
+        if approximation not in (None, 'nystroem'):
+            raise ValueError("The supported approximation is 'nystroem', got {0}".format(approximation))
         self.name = 'LPModel'
         self.kernel = kernel
         self.alpha = alpha
         self.gamma = gamma
         self.learning_rate = learning_rate
+        self.approximation = approximation
+        self.n_components = n_components
+        self.n_neighbors = n_neighbors
+        self.random_state = random_state
+
+    def _spreading(self, gamma, kernel=None):
+        """
+        The (untrained) label spreading estimator for 'gamma'
+        """
+        if self.approximation == 'nystroem':
+            return NystroemLabelSpreading(gamma=gamma, alpha=self.alpha, n_components=self.n_components,
+                                          random_state=getattr(self, 'nystroem_seed', self.random_state))
+        if isinstance(kernel, CachedRBFKernel):
+            # Same propagation as LabelSpreading, keeping the unnormalized distributions for warm starts
+            return WarmLabelSpreading(kernel, alpha=self.alpha)
+        return LabelSpreading(kernel=kernel or self.kernel, alpha=self.alpha, gamma=gamma)
 
     # Tune parameters of the model
     def optimize(self, min_, max_, niter=10, stepsize = 0.1):
@@ -82,13 +371,18 @@ class LPModel(ModelBase):
         minimizer_bounds = [(min_, max_)]
 
         minimizer_kwargs = dict(method = "L-BFGS-B", bounds = minimizer_bounds)
+        # Use the same Nystroem components for every gamma and for the final fit, otherwise the objective is noisy
+        if self.random_state is not None:
+            self.nystroem_seed = self.random_state
+        else:
+            self.nystroem_seed = np.random.randint(np.iinfo(np.int32).max)
         res = basinhopping(self.objective, start, minimizer_kwargs=minimizer_kwargs,
                    niter=niter, accept_test=global_bounds, take_step = step_routine, disp = True)
         return res.x
 
     def objective(self, x):
-        model = label_propagation.LabelSpreading(kernel=self.kernel, alpha=self.alpha, 
-                gamma=x)
+        x = float(np.ravel(x)[0])
+        model = self._spreading(x, self._cached_kernel(x))
         model.fit(self.x, self.y)
         label_prob = model.label_distributions_
         return get_average_label_entropy(label_prob) + self.learning_rate*x**2 
@@ -103,10 +397,71 @@ class LPModel(ModelBase):
         self.gamma = self.optimize(min_, max_, niter, stepsize)[0]
 
         # Propogate labels
-        self.model = label_propagation.LabelSpreading(kernel=self.kernel, alpha=self.alpha, 
-                    gamma=self.gamma)
+        self._fit()
+
+    def _caches_affinity(self):
+        return self.kernel == 'rbf' and self.approximation is None
+
+    def _cached_kernel(self, gamma):
+        """
+        The RBF kernel over the training inputs for 'gamma', reusing the cached distances while the inputs are the
+        same; None when the affinities are not cached
+        """
+        if not self._caches_affinity():
+            return None
+        cached_kernel = getattr(self, 'cached_kernel', None)
+        if cached_kernel is None or cached_kernel.x is not self.x or cached_kernel.n_neighbors != self.n_neighbors:
+            self.cached_kernel = CachedRBFKernel(gamma, self.x, self.n_neighbors)
+            self.x = self.cached_kernel.x
+        elif cached_kernel.gamma != gamma:
+            cached_kernel.set_gamma(gamma)
+        return self.cached_kernel
+
+    def _fit(self):
+        self.model = self._spreading(self.gamma, self._cached_kernel(self.gamma))
         self.model.fit(self.x, self.y)
 
+    # Add (labeled or unlabeled) data to the trained model, keeping gamma
+    def update(self, new_x, new_y, warm_start=False, max_iter=5):
+        """
+        :param new_x: the new inputs
+        :param new_y: their labels, -1 for unlabeled inputs
+        :param warm_start: continue the propagation from the current label distributions for at most 'max_iter'
+            iterations, instead of propagating from scratch. Requires the RBF kernel without approximation.
+        :param max_iter: the number of warm-started iterations
+        """
+        new_x = np.asarray(new_x, dtype=float)
+        if self._caches_affinity():
+            self._cached_kernel(self.gamma).extend(new_x)
+            self.x = self.cached_kernel.x
+        else:
+            self.x = np.vstack((self.x, new_x))
+        self.y = np.concatenate((self.y, np.asarray(new_y).reshape(-1)))
+        if warm_start:
+            self._propagate(max_iter)
+        else:
+            self._fit()
+
+    # Label (or unlabel, with -1) training points of the trained model, keeping gamma
+    def relabel(self, indices, labels, max_iter=5):
+        """
+        Set the labels of the training points 'indices' and continue the propagation from the current label
+        distributions for at most 'max_iter' iterations, e.g. after a user labeled a few points interactively
+        """
+        self.y = np.array(self.y)
+        self.y[indices] = labels
+        self._propagate(max_iter)
+
+    def _propagate(self, max_iter):
+        """
+        Warm-started propagation from the label distributions of the current model over the current data
+        """
+        if not self._caches_affinity():
+            raise ValueError("Warm-started propagation requires the RBF kernel without approximation")
+        previous = self.model
+        self.model = WarmLabelSpreading(self._cached_kernel(self.gamma), alpha=self.alpha, max_iter=max_iter)
+        self.model.fit(self.x, self.y, distributions=previous.distributions_, classes=previous.classes_)
+
     # Predict
     def predict(self, xp):
         # predict
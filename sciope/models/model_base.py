@@ -17,7 +17,48 @@ Surrogate Model Base Class
 
 # Imports
 from abc import ABCMeta, abstractmethod
+from multiprocessing.pool import ThreadPool
+from collections import OrderedDict, deque
+from sciope.utilities.transport.shared_memory_transport import dumps_out_of_band, loads_out_of_band
+import multiprocessing as mp
 import numpy as np
+import json
+import os
+
+# The model, set in each worker process by _init_worker
+_worker_model = None
+
+
+def _init_worker(model):
+    global _worker_model
+    _worker_model = model
+
+
+def _predict_chunk(xt):
+    return _worker_model.predict(xt)
+
+
+def _bounded_imap(pool, function, chunks, window):
+    """
+    Ordered results of 'function' over 'chunks', with at most 'window' chunks submitted to 'pool' and not yet
+    returned, unlike pool.imap, which submits all of them at once
+    """
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.apply_async(function, (chunk,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def _to_json(value):
+    """
+    Fallback serializer for the hyperparameters stored in the model metadata
+    """
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return repr(value)
 
 
 # Class definition
@@ -30,6 +71,19 @@ class ModelBase(object):
     * ModelBase.train(x,y)
     * ModelBase.predict(xt)
 
+    Models that can be updated more cheaply than by training from scratch override:
+
+    * ModelBase.update(new_x,new_y)
+
+    Large test sets are predicted in chunks with:
+
+    * ModelBase.predict_batch(xt)
+
+    Trained models are stored and reopened with:
+
+    * ModelBase.save(path)
+    * ModelBase.load(path)
+
     The following variables are available to derived classes:
 
     * self.x			(training inputs)
@@ -40,6 +94,9 @@ class ModelBase(object):
     """
     __metaclass__ = ABCMeta
 
+    # Version of the directory layout written by save
+    storage_version = 1
+
     def __init__(self, name):
         self.name = name
 
@@ -71,8 +128,128 @@ class ModelBase(object):
         Sub-classable method for training a given surrogate. Each derived class must implement.
         """
 
+    def scale_targets(self, y):
+        """
+        Scale targets with the mean and std dev of the training data, NaNs are replaced by the mean
+        """
+        y = np.real(np.asarray(y)).astype(float).reshape(-1)
+        y[np.isnan(y)] = self.my
+        return (y - self.my) / self.sy
+
+    def update(self, new_x, new_y):
+        """
+        Sub-classable method for adding training data to a trained surrogate. By default, the model is trained again
+        on all data.
+        """
+        x = np.vstack((self.x, new_x))
+        y = np.concatenate((self.y * self.sy + self.my, np.real(np.asarray(new_y)).astype(float).reshape(-1)))
+        self.train(x, y.reshape(-1, 1))
+
     @abstractmethod
     def predict(self, test_input):
         """
         Sub-classable method for predicting test data. Each derived class must implement.
         """
+
+    def predict_batch(self, xt, chunk_size=10000, n_jobs=1, backend='thread', out=None):
+        """
+        Predict a large test set chunk by chunk, so that the memory held by 'predict' is bounded by the chunk size.
+        In parallel, at most 2 * n_jobs chunks are in flight at any time.
+        :param xt: test inputs
+        :param chunk_size: number of test inputs predicted at once
+        :param n_jobs: number of chunks predicted in parallel
+        :param backend: 'thread' (a thread pool, for models whose predict releases the GIL) or 'process' (a process
+                        pool, each worker receives a copy of the model once)
+        :param out: preallocated output, with the structure returned by 'predict' (an array, or a tuple of arrays
+                    for models returning several outputs), e.g. views of memory mapped files
+        :return: 'out', or newly allocated arrays holding the predictions
+        """
+        if backend not in ('thread', 'process'):
+            raise ValueError("Supported backends are 'thread' and 'process', got {0}".format(backend))
+        nt = xt.shape[0]
+        if nt == 0 and out is None:
+            return self.predict(xt)
+        starts = range(0, nt, chunk_size)
+        chunks = (xt[start:start + chunk_size] for start in starts)
+        pool = None
+        if n_jobs == 1:
+            results = map(self.predict, chunks)
+        elif backend == 'thread':
+            pool = ThreadPool(n_jobs)
+            results = _bounded_imap(pool, self.predict, chunks, 2 * n_jobs)
+        else:
+            pool = mp.Pool(n_jobs, initializer=_init_worker, initargs=(self,))
+            results = _bounded_imap(pool, _predict_chunk, chunks, 2 * n_jobs)
+
+        single = not isinstance(out, tuple)
+        outputs = None if out is None else (out if isinstance(out, tuple) else (out,))
+        try:
+            for start, result in zip(starts, results):
+                parts = result if isinstance(result, tuple) else (result,)
+                if outputs is None:
+                    single = not isinstance(result, tuple)
+                    outputs = tuple(np.empty((nt,) + np.shape(part)[1:], dtype=np.asarray(part).dtype)
+                                    for part in parts)
+                for output, part in zip(outputs, parts):
+                    output[start:start + len(part)] = part
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return outputs[0] if single else outputs
+
+    def save(self, path, min_bytes=1 << 16):
+        """
+        Write the trained model to the directory 'path'. The model is pickled (protocol 5) into 'model.pkl', except
+        for the data of large arrays (fitted estimator state, training data), which is stored raw in .npy files that
+        can later be memory-mapped. The format version, class, scaling state and hyperparameters of the fitted
+        estimator go into 'metadata.json'.
+        :param path: target directory, created if it does not exist
+        :param min_bytes: arrays smaller than this are kept in the pickle
+        :return: -
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        data, buffers = dumps_out_of_band(self, min_bytes)
+        with open(os.path.join(path, 'model.pkl'), 'wb') as f:
+            f.write(data)
+        for i, buffer in enumerate(buffers):
+            np.save(os.path.join(path, 'buffer_{0}.npy'.format(i)), np.frombuffer(buffer.raw(), dtype=np.uint8),
+                    allow_pickle=False)
+
+        estimator = getattr(self, 'model', None)
+        metadata = OrderedDict()
+        metadata['storage_version'] = self.storage_version
+        metadata['class'] = '{0}.{1}'.format(type(self).__module__, type(self).__name__)
+        metadata['name'] = self.name
+        metadata['my'] = getattr(self, 'my', None)
+        metadata['sy'] = getattr(self, 'sy', None)
+        metadata['hyperparameters'] = estimator.get_params(deep=False) if hasattr(estimator, 'get_params') else None
+        metadata['buffers'] = len(buffers)
+        with open(os.path.join(path, 'metadata.json'), 'w') as f:
+            json.dump(metadata, f, indent=2, default=_to_json)
+
+    @classmethod
+    def load(cls, path, mmap_mode='c'):
+        """
+        Open a model previously written with save. Large arrays are memory-mapped rather than read, so workers
+        loading the same model share its pages instead of each holding a copy.
+        :param path: directory written by save
+        :param mmap_mode: numpy memory-map mode of the arrays; the default 'c' (copy-on-write) never modifies the
+                          files, None reads everything into memory
+        :return: the loaded model
+        """
+        with open(os.path.join(path, 'metadata.json'), 'r') as f:
+            metadata = json.load(f)
+        if metadata['storage_version'] > cls.storage_version:
+            raise ValueError("Model in {0} has storage version {1}, this version of sciope reads up to {2}".format(
+                path, metadata['storage_version'], cls.storage_version))
+
+        buffers = [np.load(os.path.join(path, 'buffer_{0}.npy'.format(i)), mmap_mode=mmap_mode)
+                   for i in range(metadata['buffers'])]
+        with open(os.path.join(path, 'model.pkl'), 'rb') as f:
+            model = loads_out_of_band(f.read(), buffers)
+        if not isinstance(model, cls):
+            raise TypeError("{0} holds a {1}, not a {2}".format(path, metadata['class'], cls.__name__))
+        return model
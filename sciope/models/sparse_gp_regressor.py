@@ -0,0 +1,134 @@
+# Copyright 2019 Prashant Singh, Fredrik Wrede and Andreas Hellander
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Sparse (FITC) Gaussian Process Regression Surrogate Model
+"""
+
+# Imports
+from sciope.models.model_base import ModelBase
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import ConstantKernel, RBF, WhiteKernel
+from scipy.linalg import cho_factor, cho_solve, solve_triangular
+import numpy as np
+
+
+# Class definition
+class SparseGPRModel(ModelBase):
+    """
+    Gaussian process regression with the fully independent training conditional (FITC) approximation.
+
+    The process is represented by its values at m inducing points, a random subset of the training inputs. Training
+    streams over the data in mini-batches and accumulates the m x m sufficient statistics, so it costs O(n m^2) time
+    and O(batch_size m + m^2) memory instead of the O(n^3) time and O(n^2) memory of GPRModel. The kernel
+    hyperparameters are fitted with the sklearn GP Regressor on a random subset of the data. As the statistics are
+    sums over the data, 'update' adds new data in O(k m^2).
+
+    Key reference:
+    Snelson, Edward, and Zoubin Ghahramani. "Sparse Gaussian processes using pseudo-inputs."
+    Advances in neural information processing systems. 2006.
+    """
+
+    def __init__(self, num_inducing=500, num_hyperparameter_samples=1000, batch_size=10000, n_restarts_optimizer=1,
+                 jitter=1e-6):
+        """
+        :param num_inducing: number of inducing points m
+        :param num_hyperparameter_samples: size of the subset the kernel hyperparameters are fitted on
+        :param batch_size: number of training points processed at once
+        :param n_restarts_optimizer: optimizer restarts of the hyperparameter fit
+        :param jitter: relative to the prior variance, added to the diagonal of the inducing point covariance
+        """
+        self.name = 'SparseGPRModel'
+        self.num_inducing = num_inducing
+        self.num_hyperparameter_samples = num_hyperparameter_samples
+        self.batch_size = batch_size
+        self.n_restarts_optimizer = n_restarts_optimizer
+        self.jitter = jitter
+
+    def fit_hyperparameters(self, x, y):
+        """
+        Fit the kernel on a random subset of (x, y)
+        :return: the signal kernel and the noise variance
+        """
+        subset = np.random.choice(x.shape[0], min(self.num_hyperparameter_samples, x.shape[0]), replace=False)
+        kernel = ConstantKernel(1.0) * RBF(length_scale=np.ones(x.shape[1])) + WhiteKernel(1e-2)
+        gp = GaussianProcessRegressor(kernel=kernel, n_restarts_optimizer=self.n_restarts_optimizer)
+        gp.fit(x[subset], y[subset])
+        return gp.kernel_.k1, gp.kernel_.k2.noise_level
+
+    def _accumulate(self, x, y):
+        """
+        Add the contribution of the training points (x, y) to the sufficient statistics, in mini-batches. The
+        statistics are kept in the basis whitened by the inducing point covariance, where they are well conditioned.
+        """
+        for start in range(0, x.shape[0], self.batch_size):
+            xb = x[start:start + self.batch_size]
+            yb = y[start:start + self.batch_size]
+            v = solve_triangular(self.chol_mm, self.kernel(self.inducing, xb), lower=True)
+            # FITC: diagonal correction of the Nystrom approximation of the training covariance, plus noise
+            lam = self.kernel.diag(xb) - np.sum(v ** 2, axis=0) + self.noise
+            weighted = v / lam
+            self.a += weighted.dot(v.T)
+            self.b += weighted.dot(yb)
+        self._solve()
+
+    def _solve(self):
+        self.chol_sigma = cho_factor(np.eye(len(self.b)) + self.a, lower=True)
+        self.w = cho_solve(self.chol_sigma, self.b)
+
+    # train the sparse GP model given the data
+    def train(self, inputs, targets):
+        # Scale the training data
+        self.scale_training_data(inputs, targets)
+
+        # Kernel and inducing points
+        self.kernel, self.noise = self.fit_hyperparameters(self.x, self.y)
+        m = min(self.num_inducing, self.n)
+        self.inducing = self.x[np.random.choice(self.n, m, replace=False)]
+        kmm = self.kernel(self.inducing)
+        self.chol_mm = np.linalg.cholesky(kmm + self.jitter * np.mean(np.diag(kmm)) * np.eye(m))
+
+        # Sufficient statistics sum v_i y_i / lambda_i and sum v_i v_i^T / lambda_i, with v_i = L_mm^-1 K_mi
+        self.a = np.zeros((m, m))
+        self.b = np.zeros(m)
+        self._accumulate(self.x, self.y)
+
+    # Add training data to the trained model, keeping the kernel and the inducing points
+    def update(self, new_x, new_y):
+        new_x = np.asarray(new_x, dtype=float)
+        new_y = self.scale_targets(new_y)
+        self._accumulate(new_x, new_y)
+        self.x = np.vstack((self.x, new_x))
+        self.y = np.concatenate((self.y, new_y))
+        self.n = self.x.shape[0]
+
+    # Predict
+    # * NOTE *
+    # Like GPRModel, returns the mean and the standard deviation of prediction (of the latent function)
+    def predict(self, xt):
+        yp = np.empty(xt.shape[0])
+        sigma = np.empty(xt.shape[0])
+        for start in range(0, xt.shape[0], self.batch_size):
+            xb = xt[start:start + self.batch_size]
+            vs = solve_triangular(self.chol_mm, self.kernel(self.inducing, xb), lower=True)
+            yp[start:start + self.batch_size] = vs.T.dot(self.w)
+            # Prior variance, minus the part explained by the inducing points, plus their posterior uncertainty
+            q = np.sum(vs ** 2, axis=0)
+            s = np.sum(vs * cho_solve(self.chol_sigma, vs), axis=0)
+            sigma[start:start + self.batch_size] = np.sqrt(np.maximum(self.kernel.diag(xb) - q + s, 0))
+
+        # Scale back
+        nt = xt.shape[0]
+        yp = yp.reshape(nt, 1)
+        yp = yp * self.sy + self.my
+        return yp, sigma
@@ -17,39 +17,109 @@ Support Vector Machine Regression Surrogate Model
 
 # Imports
 from sciope.models.model_base import ModelBase
-from sklearn.svm import SVR
-from sklearn.model_selection import GridSearchCV
+from sklearn.svm import SVR, LinearSVR
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.pipeline import Pipeline
+from sklearn.experimental import enable_halving_search_cv  # enables HalvingGridSearchCV
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV
 
 
 # Class definition
 class SVRModel(ModelBase):
     """
     We use the sklearn SVM implementation here.
+
+    C and gamma are tuned by cross-validated search over a grid, by default with successive halving: all candidates
+    are evaluated on a small subsample, and only the best third of them proceeds to a three times larger one, until
+    'max_resources' samples are used. Below 'min_halving_samples' training samples the subsamples would be too small
+    to rank the candidates, so the full grid is searched instead. The folds are fitted in parallel on all CPUs by
+    default. The best parameters are kept and reused by later train calls until the training set has grown by
+    'factor' since they were tuned; set 'best_params' to None to tune again.
+
+    Exact SVR training scales quadratically or worse with the number of samples. With 'approximation' set, inputs
+    are mapped to 'n_components' features approximating the RBF kernel, by the Nystroem method ('nystroem') or by
+    random Fourier features ('rff'), and a linear SVR is fitted on the features, which scales linearly.
     """
 
-    def __init__(self):
+    def __init__(self, tuning='halving', Cs=(0.001, 0.01, 0.1, 1, 10), gammas=(0.001, 0.01, 0.1, 1), nfolds=5,
+                 factor=3, max_resources=None, n_jobs=-1, cache_parameters=True, approximation=None,
+                 n_components=300, min_halving_samples=1000):
+        """
+        :param tuning: 'halving' (successive halving) or 'grid' (exhaustive grid search)
+        :param Cs: candidate values of C
+        :param gammas: candidate values of gamma
+        :param nfolds: number of cross-validation folds
+        :param factor: successive halving keeps 1/factor of the candidates and grows the subsample by 'factor'; cached
+                       parameters are tuned again once the training set has grown by 'factor'
+        :param max_resources: largest number of training samples used by successive halving, all if None
+        :param n_jobs: number of folds and candidates fitted in parallel, all CPUs if -1, serial if None or 1
+        :param cache_parameters: reuse the tuned parameters in later train calls
+        :param approximation: None (exact RBF kernel), 'nystroem' or 'rff'
+        :param n_components: number of features approximating the kernel
+        :param min_halving_samples: smallest training set tuned by successive halving, smaller ones use the full grid
+        """
+        if tuning not in ('halving', 'grid'):
+            raise ValueError("Supported tuning modes are 'halving' and 'grid', got {0}".format(tuning))
+        if approximation not in (None, 'nystroem', 'rff'):
+            raise ValueError("Supported approximations are 'nystroem' and 'rff', got {0}".format(approximation))
         self.name = 'SVRModel'
+        self.tuning = tuning
+        self.Cs = list(Cs)
+        self.gammas = list(gammas)
+        self.nfolds = nfolds
+        self.factor = factor
+        self.max_resources = max_resources
+        self.n_jobs = n_jobs
+        self.cache_parameters = cache_parameters
+        self.approximation = approximation
+        self.n_components = n_components
+        self.min_halving_samples = min_halving_samples
+        self.best_params = None
+        self.tuned_size = None
+
+    def _estimator(self, C=1.0, gamma=1.0):
+        """
+        The (untrained) regressor for the given parameters
+        """
+        if self.approximation is None:
+            return SVR(kernel='rbf', C=C, gamma=gamma)
+        if self.approximation == 'nystroem':
+            features = Nystroem(kernel='rbf', gamma=gamma, n_components=self.n_components)
+        else:
+            features = RBFSampler(gamma=gamma, n_components=self.n_components)
+        # The primal formulation scales linearly with the number of samples
+        return Pipeline([('features', features),
+                         ('svr', LinearSVR(C=C, loss='squared_epsilon_insensitive', dual=False))])
 
     # Tune parameters of the model
     def tune_parameters(self, X, y, nfolds):
-        Cs = [0.001, 0.01, 0.1, 1, 10]
-        gammas = [0.001, 0.01, 0.1, 1]
-        param_grid = {'C': Cs, 'gamma': gammas}
-        grid_search = GridSearchCV(SVR(kernel='rbf'), param_grid, cv=nfolds)
-        grid_search.fit(X, y)
-        grid_search.best_params_
-        return grid_search.best_params_
+        if self.approximation is None:
+            names = {'C': 'C', 'gamma': 'gamma'}
+        else:
+            names = {'C': 'svr__C', 'gamma': 'features__gamma'}
+        param_grid = {names['C']: self.Cs, names['gamma']: self.gammas}
+        if self.tuning == 'halving' and X.shape[0] >= self.min_halving_samples:
+            max_resources = 'auto' if self.max_resources is None else min(self.max_resources, X.shape[0])
+            search = HalvingGridSearchCV(self._estimator(), param_grid, cv=nfolds, factor=self.factor,
+                                         max_resources=max_resources, min_resources='exhaust', n_jobs=self.n_jobs)
+        else:
+            search = GridSearchCV(self._estimator(), param_grid, cv=nfolds, n_jobs=self.n_jobs)
+        search.fit(X, y)
+        return {name: search.best_params_[key] for name, key in names.items()}
 
     # train the SVR model given the data
     def train(self, inputs, targets):
         # Scale the training data
         self.scale_training_data(inputs, targets)
 
-        # Tune parameters using 5-fold CV and grid-search
-        params = self.tune_parameters(self.x, self.y, 5)
+        # Tune parameters using cross-validated search, unless known from a previous call on similar data
+        if self.best_params is None or not self.cache_parameters or self.n >= self.factor * self.tuned_size:
+            self.best_params = self.tune_parameters(self.x, self.y, self.nfolds)
+            self.tuned_size = self.n
+        params = self.best_params
 
         # Train the model
-        self.model = SVR(C=params['C'], gamma=params['gamma'])
+        self.model = self._estimator(C=params['C'], gamma=params['gamma'])
         self.model.fit(self.x, self.y)
 
     # Predict
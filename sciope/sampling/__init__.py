@@ -1 +1 @@
-__all__ = ["sampling_base", "maximin_sampling"]
\ No newline at end of file
+__all__ = ["sampling_base", "maximin_sampling", "uncertainty_sampling"]
\ No newline at end of file
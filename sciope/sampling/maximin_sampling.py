@@ -18,6 +18,7 @@ Ranks monte-carlo samples such that minimum distance between them is maximized
 
 # Imports
 from sciope.sampling.sampling_base import SamplingBase
+from sciope.data.spatial_index import SpatialIndex
 from scipy.spatial import distance_matrix
 from sciope.utilities.housekeeping import sciope_logger as ml
 import numpy as np
@@ -31,8 +32,12 @@ class MaximinSampling(SamplingBase):
     """
     Algorithm:
     1. Generate MC candidate samples
-    2. Compute pairwise distance between existing samples and candidates
-    3. Select new samples that maximize the minimum distance
+    2. Compute the distance from each candidate to its nearest existing sample
+    3. Select new samples that maximize the minimum distance, one at a time, updating the minimum distances of the
+       candidates with their distance to each selected sample
+
+    Nearest sample distances are found with a k-d tree over the existing samples, kept between calls and updated
+    when samples are appended, so large designs are never compared against the candidates densely.
 
     Key reference:
     Johnson, Mark E., Leslie M. Moore, and Donald Ylvisaker.
@@ -40,49 +45,92 @@ class MaximinSampling(SamplingBase):
     Journal of statistical planning and inference 26.2 (1990): 131-148.
     """
 
-    def __init__(self, xmin, xmax):
+    def __init__(self, xmin, xmax, candidates_ratio=10, chunk_size=2 ** 20, use_tree=True):
+        """
+        :param xmin: lower bound of each dimension
+        :param xmax: upper bound of each dimension
+        :param candidates_ratio: number of MC candidates per existing and requested sample
+        :param chunk_size: maximum number of candidate-sample distances held in memory at once, without the tree
+        :param use_tree: find nearest samples with a k-d tree instead of dense distance blocks
+        """
         name = 'MaximinSampling'
         super(MaximinSampling, self).__init__(name, xmin, xmax)
+        self.candidates_ratio = candidates_ratio
+        self.chunk_size = chunk_size
+        self.use_tree = use_tree
+        self.index = None
         logger.info("Maximin sequential sampler in {0} dimensions initialized".format(len(self.xmin)))
 
-    # Example call:
-    # ms = MaximinSampling([0,0], [1,1])
-    # new_points = ms.select_point(X)
-    def select_point(self, x):
+    def _index_for(self, x):
         """
-        Get top ranked candidate according to maximin sampling to add to current samples x
+        Spatial index over the samples x. The index of the previous call is reused when x extends its samples.
         """
-        # Set up stuff
-        num_samples = x.shape[0]
-        num_dimensions = x.shape[1]
-        candidates_ratio = 10
-        num_candidates = num_samples * candidates_ratio
+        if self.index is not None and x.shape[0] >= self.index.size and \
+                np.array_equal(x[:self.index.size], self.index.points):
+            self.index.update(x)
+        else:
+            self.index = SpatialIndex(x)
+        return self.index
 
-        # Generate MC candidates
-        c = np.random.uniform(low=self.xmin, high=self.xmax, size=(num_candidates, num_dimensions))
+    def min_distances(self, c, x):
+        """
+        Minimum Manhattan distance from each candidate in 'c' to the samples 'x'
+        :param c: m x d array of candidates
+        :param x: N x d array of samples
+        :return: m-sized vector of distances, inf if x is empty
+        """
+        ranking = np.full(c.shape[0], np.inf)
+        if x.shape[0] == 0:
+            return ranking
+        if self.use_tree:
+            # p = 1 implies Manhattan distance
+            distances, _ = self._index_for(x).knn(c, k=1, p=1)
+            return distances[:, 0]
+
+        # Dense distances in blocks of at most 'chunk_size'
+        x_block = max(1, min(x.shape[0], self.chunk_size))
+        c_block = max(1, self.chunk_size // x_block)
+        for c_start in range(0, c.shape[0], c_block):
+            c_stop = min(c_start + c_block, c.shape[0])
+            for x_start in range(0, x.shape[0], x_block):
+                dist = distance_matrix(c[c_start:c_stop], x[x_start:x_start + x_block], p=1)
+                np.minimum(ranking[c_start:c_stop], dist.min(axis=1), out=ranking[c_start:c_stop])
+        return ranking
 
-        # Compute distances
-        # p = 1 implies Manhattan distance
-        dist = distance_matrix(c, x, p=1)
+    def _select(self, x, n):
+        num_samples, num_dimensions = x.shape
+        num_candidates = self.candidates_ratio * max(num_samples + n, 1)
 
-        # Minimum distance...
-        ranking = dist.min(axis=1)
+        # Fixed pool of MC candidates and their minimum distance to the current samples
+        c = np.random.uniform(low=self.xmin, high=self.xmax, size=(num_candidates, num_dimensions))
+        ranking = self.min_distances(c, x)
 
-        # ... is maximized
-        idx = np.argsort(-ranking)
+        selected = np.empty(min(n, num_candidates), dtype=int)
+        for i in range(len(selected)):
+            # The minimum distance is maximized...
+            idx = np.argmax(ranking)
+            selected[i] = idx
+            # ... and updated with the distances to the new sample only
+            np.minimum(ranking, np.abs(c - c[idx]).sum(axis=1), out=ranking)
+            ranking[idx] = -np.inf
+        return c[selected]
 
-        # ta-da!
+    # Example call:
+    # ms = MaximinSampling([0,0], [1,1])
+    # new_points = ms.select_point(X)
+    def select_point(self, x):
+        """
+        Get top ranked candidate according to maximin sampling to add to current samples x
+        """
+        new_point = self._select(x, 1)[0]
         logger.info("Maximin sequential design: selected one new sample")
-        return c[idx[0], :]
+        return new_point
 
     def select_points(self, x, n):
         """
-        Get 'n' top ranked candidates according to maximin sampling to add to current samples x
+        Get 'n' top ranked candidates according to maximin sampling to add to current samples x. Candidates are drawn
+        once, and their minimum distances to the samples are kept up to date as new samples are selected.
         """
-        c = []
-        for idx in range(0, n):
-            c_new = self.selectPoint(x)
-            x = np.vstack((x, c_new))
-            c.append(c_new)
+        new_points = self._select(x, n)
         logger.info("Maximin sequential design: selected {0} new samples".format(n))
-        return np.array(c)
+        return new_points
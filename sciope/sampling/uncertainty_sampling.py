@@ -0,0 +1,154 @@
+# Copyright 2019 Prashant Singh, Fredrik Wrede and Andreas Hellander
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Batch uncertainty sampling
+Selects q points at once where the predictive uncertainty of a surrogate model is largest
+"""
+
+# Imports
+from sciope.sampling.sampling_base import SamplingBase
+from sciope.data.spatial_index import SpatialIndex
+from sciope.utilities.housekeeping import sciope_logger as ml
+from sklearn.gaussian_process import GaussianProcessRegressor
+import numpy as np
+
+# Set up the logger
+logger = ml.SciopeLogger().get_logger()
+
+
+# Class definition
+class UncertaintySampling(SamplingBase):
+    """
+    Algorithm:
+    1. Generate MC candidate samples
+    2. Predict the uncertainty (sigma) of the surrogate at the candidates
+    3. Select the candidate of largest uncertainty, then discount the uncertainty around it and repeat until q points
+       are selected
+
+    Two heuristics discount the uncertainty around selected points:
+    * 'penalization' (local penalization): once a point is simulated its uncertainty vanishes, and as sigma is
+      Lipschitz continuous with constant L, the uncertainty at distance r from it is at most L * r. The acquisition is
+      capped accordingly. L is estimated from the candidates. Works with any model whose predict returns (yp, sigma).
+    * 'believer' (kriging believer): the selected points are added to the training data of the Gaussian process with
+      their predicted mean as targets, and sigma is recomputed with the kernel hyperparameters kept fixed. Requires
+      a trained GPRModel.
+
+    Key references:
+    Gonzalez, Javier, et al. "Batch Bayesian optimization via local penalization."
+    Artificial intelligence and statistics. 2016.
+    Ginsbourger, David, Rodolphe Le Riche, and Laurent Carraro. "Kriging is well-suited to parallelize optimization."
+    Computational intelligence in expensive optimization problems. Springer, 2010. 131-162.
+    """
+
+    def __init__(self, xmin, xmax, model, strategy='penalization', candidates_ratio=10, min_candidates=1000):
+        """
+        :param xmin: lower bound of each dimension
+        :param xmax: upper bound of each dimension
+        :param model: trained surrogate model whose predict(xt) returns (yp, sigma), e.g. GPRModel
+        :param strategy: 'penalization' or 'believer'
+        :param candidates_ratio: number of MC candidates per existing and requested sample
+        :param min_candidates: minimum number of MC candidates
+        """
+        if strategy not in ('penalization', 'believer'):
+            raise ValueError("Supported strategies are 'penalization' and 'believer', got {0}".format(strategy))
+        name = 'UncertaintySampling'
+        super(UncertaintySampling, self).__init__(name, xmin, xmax)
+        self.model = model
+        self.strategy = strategy
+        self.candidates_ratio = candidates_ratio
+        self.min_candidates = min_candidates
+        logger.info("Uncertainty sampler in {0} dimensions initialized".format(len(self.xmin)))
+
+    def _sigma(self, c):
+        _, sigma = self.model.predict(c)
+        return np.asarray(sigma, dtype=float).ravel()
+
+    @staticmethod
+    def lipschitz_constant(c, sigma):
+        """
+        Estimate of the Lipschitz constant of sigma: the largest slope between each candidate and its nearest neighbour.
+        Duplicate candidates are removed, and neighbours closer than a tiny fraction of the extent of the candidates
+        are skipped, as the noise in sigma would give an arbitrarily large slope and disable the penalization.
+        :param c: m x d array of candidates
+        :param sigma: m-sized vector of uncertainties at the candidates
+        :return: the estimated constant
+        """
+        c, first = np.unique(c, axis=0, return_index=True)
+        sigma = np.asarray(sigma)[first]
+        if c.shape[0] < 2:
+            return np.finfo(float).eps
+        distances, indices = SpatialIndex(c).knn(c, k=min(3, c.shape[0]))
+        tolerance = np.sqrt(np.finfo(float).eps) * np.max(np.ptp(c, axis=0))
+        # The nearest neighbour that is not a near duplicate, if any
+        rows = np.arange(c.shape[0])
+        columns = np.argmax(distances[:, 1:] > tolerance, axis=1) + 1
+        neighbour_distances = distances[rows, columns]
+        distinct = neighbour_distances > tolerance
+        slopes = np.abs(sigma - sigma[indices[rows, columns]])[distinct] / neighbour_distances[distinct]
+        return max(np.max(slopes, initial=0.0), np.finfo(float).eps)
+
+    def _select_penalization(self, c, n):
+        sigma = self._sigma(c)
+        lipschitz = self.lipschitz_constant(c, sigma)
+        acquisition = sigma.copy()
+        selected = []
+        for i in range(n):
+            idx = np.argmax(acquisition)
+            selected.append(idx)
+            # Uncertainty cannot rise faster than L away from the new (soon simulated) point
+            bound = lipschitz * np.sqrt(np.sum((c - c[idx]) ** 2, axis=1))
+            np.minimum(acquisition, bound, out=acquisition)
+            acquisition[idx] = -np.inf
+        return selected
+
+    def _select_believer(self, c, n):
+        gp = getattr(self.model, 'model', None)
+        if not hasattr(gp, 'kernel_'):
+            raise ValueError("The 'believer' strategy requires a trained GPRModel")
+        x_train = gp.X_train_
+        y_train = gp.y_train_
+        believer = gp
+        selected = []
+        for i in range(n):
+            _, sigma = believer.predict(c, return_std=True)
+            sigma[selected] = -np.inf
+            idx = np.argmax(sigma)
+            selected.append(idx)
+            # Believe the predicted mean at the new point and condition on it, keeping the hyperparameters
+            x_train = np.vstack((x_train, c[idx]))
+            y_train = np.append(y_train, believer.predict(c[idx:idx + 1]))
+            believer = GaussianProcessRegressor(kernel=gp.kernel_, alpha=gp.alpha, optimizer=None)
+            believer.fit(x_train, y_train)
+        return selected
+
+    def select_point(self, x):
+        """
+        Get the candidate of largest surrogate uncertainty to add to current samples x
+        """
+        return self.select_points(x, 1)[0]
+
+    def select_points(self, x, n):
+        """
+        Get a batch of 'n' candidates of large surrogate uncertainty to add to current samples x
+        """
+        num_samples, num_dimensions = x.shape
+        num_candidates = max(self.candidates_ratio * (num_samples + n), self.min_candidates, n)
+        c = np.random.uniform(low=self.xmin, high=self.xmax, size=(num_candidates, num_dimensions))
+
+        if self.strategy == 'penalization':
+            selected = self._select_penalization(c, n)
+        else:
+            selected = self._select_believer(c, n)
+        logger.info("Uncertainty sampling: selected {0} new samples".format(n))
+        return c[selected]
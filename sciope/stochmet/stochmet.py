@@ -129,9 +129,11 @@ class DataSetMET(DataSet):
     DataSet class. Container for keeping MET results in memory. 
     """
 
-    def __init__(self):
+    array_attributes = DataSet.array_attributes + ('user_labels',)
+
+    def __init__(self, ts_dtype=None, s_dtype=None):
         name = 'stochmet'
-        super(DataSetMET, self).__init__(name)
+        super(DataSetMET, self).__init__(name, ts_dtype, s_dtype)
         self.user_labels = None
 
     def add_points(self, inputs=None, targets=None, time_series=None, summary_stats=None, user_labels=None):
@@ -172,6 +174,12 @@ class StochMET():
 
     default_batch_size : int, sets the default batch size of the parameter sweeps. Default is 10.
 
+    ts_dtype : storage type of the collected trajectories, see DataSet. Use 'auto' to store integer
+               molecule counts in the smallest lossless integer type, or e.g. numpy.uint32 to enforce
+               a type. Default is None (store as returned by the simulator).
+
+    s_dtype : storage type of the collected features, None, numpy.float32 or numpy.float64. Default is None.
+
     Attributes
     ----------
     data : Local data container stored in local memory, which holds the results from each batch.
@@ -186,13 +194,14 @@ class StochMET():
 
     """
 
-    def __init__(self, simulator=None, sampler=None, features=None, default_batch_size=10):
+    def __init__(self, simulator=None, sampler=None, features=None, default_batch_size=10, ts_dtype=None,
+                 s_dtype=None):
         assert callable(simulator), "simulator must be a callable function" 
         assert hasattr(sampler, 'generate'), "sampling class instance must have a callable function 'generate'"
         self.simulator = simulator
         self.sampling = sampler 
         self.batch_size = default_batch_size
-        self.data = DataSetMET()
+        self.data = DataSetMET(ts_dtype, s_dtype)
         self.summaries = SummariesTSFRESH()
         if features is None:
             self.features = MinimalFCParameters()
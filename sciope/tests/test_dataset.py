@@ -0,0 +1,107 @@
+from sciope.data.dataset import DataSet
+from sciope.data import spatial_index
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def dataset():
+    ds = DataSet('test')
+    ds.add_points(inputs=np.random.rand(20, 3), targets=np.random.rand(20, 1),
+                  time_series=np.random.rand(20, 50, 2), summary_stats=np.random.rand(20, 4))
+    ds.configurations['n_species'] = 2
+    return ds
+
+
+def test_save_load(dataset, tmpdir):
+    path = str(tmpdir.join('ds'))
+    dataset.save(path)
+    loaded = DataSet.load(path)
+    assert loaded.name == dataset.name
+    assert loaded.configurations == dataset.configurations
+    assert isinstance(loaded.ts, np.memmap)
+    for attr in ('x', 'y', 'ts', 's'):
+        np.testing.assert_array_equal(getattr(loaded, attr), getattr(dataset, attr))
+    assert loaded.outlier_column_indices is None
+    assert loaded.get_size() == 20
+
+    # appending to a memory-mapped dataset works as before
+    loaded.add_points(inputs=np.random.rand(5, 3))
+    assert loaded.x.shape == (25, 3)
+
+    # saving back into the directory the arrays are mapped from keeps them intact
+    loaded.save(path)
+    np.testing.assert_array_equal(loaded.ts, dataset.ts)
+    reloaded = DataSet.load(path)
+    assert reloaded.x.shape == (25, 3)
+    np.testing.assert_array_equal(reloaded.ts, dataset.ts)
+
+
+def test_spatial_queries(dataset):
+    dataset.build_index('x', rebuild_ratio=0.1)
+    # appended points go through the unindexed buffer until the tree is rebuilt
+    for n in (1, 30):
+        dataset.add_points(inputs=np.random.rand(n, 3), targets=np.random.rand(n, 1),
+                           time_series=np.random.rand(n, 50, 2), summary_stats=np.random.rand(n, 4))
+    x = dataset.x
+
+    lower, upper = [0.2, 0.1, 0.3], [0.8, 0.9, 0.7]
+    expected = np.flatnonzero(np.all((x >= lower) & (x <= upper), axis=1))
+    np.testing.assert_array_equal(dataset.query_box(lower, upper), expected)
+
+    point = np.array([0.5, 0.5, 0.5])
+    expected = np.flatnonzero(np.linalg.norm(x - point, axis=1) <= 0.4)
+    np.testing.assert_array_equal(dataset.query_radius(point, 0.4), expected)
+
+    distances, indices = dataset.knn(point, k=5, p=1)
+    expected = np.argsort(np.abs(x - point).sum(axis=1))[:5]
+    np.testing.assert_array_equal(indices, expected)
+
+    subset = dataset.take(indices)
+    assert subset.get_size() == 5
+    assert dataset.take(slice(2, 10)).get_size() == 8
+    np.testing.assert_array_equal(subset.x, x[indices])
+    np.testing.assert_array_equal(subset.y, dataset.y[indices])
+
+    # the size follows the stored rows of both the parent and the subset as points are added
+    n = dataset.x.shape[0]
+    assert dataset.get_size() == n
+    subset.add_points(inputs=np.random.rand(3, 3), targets=np.random.rand(3, 1))
+    assert subset.get_size() == subset.x.shape[0] == 8
+    dataset.add_points(inputs=np.random.rand(2, 3), targets=np.random.rand(2, 1))
+    assert dataset.get_size() == n + 2
+
+
+def test_knn_buffer_chunks(monkeypatch):
+    # many queries against a large unindexed buffer are scored chunk by chunk
+    monkeypatch.setattr(spatial_index, 'BUFFER_CHUNK_ELEMENTS', 1000)
+    points = np.random.rand(400, 2)
+    index = spatial_index.SpatialIndex(points[:300], rebuild_ratio=1.0)
+    index.update(points)
+    assert index.tree_size == 300
+    queries = np.random.rand(500, 2)
+    distances, indices = index.knn(queries, k=3)
+    brute = np.linalg.norm(queries[:, None, :] - points[None, :, :], axis=2)
+    np.testing.assert_allclose(distances, np.sort(brute, axis=1)[:, :3])
+    np.testing.assert_array_equal(indices, np.argsort(brute, axis=1)[:, :3])
+
+
+def test_compact_storage(tmpdir):
+    ds = DataSet('counts', ts_dtype='auto', s_dtype=np.float32)
+    ds.add_points(time_series=np.random.randint(0, 1000, (5, 20, 2)).astype(float),
+                  summary_stats=np.random.rand(5, 3))
+    assert ds.ts.dtype == np.uint16
+    assert ds.s.dtype == np.float32
+    ds.add_points(time_series=np.full((1, 20, 2), 70000.0))
+    assert ds.ts.dtype == np.uint32
+    assert ds.get_time_series(np.float64).dtype == np.float64
+
+    path = str(tmpdir.join('ds'))
+    ds.save(path)
+    assert DataSet.load(path).ts.dtype == np.uint32
+
+    fixed = DataSet('fixed', ts_dtype=np.uint16)
+    with pytest.raises(ValueError):
+        fixed.add_points(time_series=np.full((1, 20, 2), 70000))
+    with pytest.raises(ValueError):
+        fixed.add_points(time_series=np.full((1, 20, 2), 0.5))
@@ -0,0 +1,104 @@
+from sciope.designs.factorial_design import FactorialDesign
+from sciope.designs.latin_hypercube_sampling import LatinHypercube
+from sciope.designs.optimized_latin_hypercube_sampling import OptimizedLatinHypercube
+from sciope.designs.random_sampling import RandomSampling
+from sciope.designs.sobol_design import SobolDesign
+from scipy.spatial.distance import pdist
+import numpy as np
+import pytest
+
+xmin = np.array([0.0, -1.0, 10.0])
+xmax = np.array([1.0, 1.0, 20.0])
+
+
+def test_random_sampling():
+    design = RandomSampling(xmin, xmax).generate(100)
+    assert design.shape == (100, 3)
+    assert np.all(design >= xmin) and np.all(design <= xmax)
+
+
+@pytest.mark.parametrize("space_filling", [True, False])
+def test_latin_hypercube(space_filling):
+    n = 50
+    design = LatinHypercube(xmin, xmax, space_filling=space_filling).generate(n)
+    assert design.shape == (n, 3)
+    # exactly one point in each stratum of each dimension
+    strata = np.floor((design - xmin) / (xmax - xmin) * n)
+    for j in range(3):
+        np.testing.assert_array_equal(np.sort(strata[:, j]), np.arange(n))
+
+
+def test_latin_hypercube_is_space_filling():
+    def min_distance(design):
+        return pdist((design - xmin) / (xmax - xmin)).min()
+    random_designs = [min_distance(LatinHypercube(xmin, xmax, space_filling=False).generate(50)) for _ in range(5)]
+    assert min_distance(LatinHypercube(xmin, xmax).generate(50)) > 1.5 * np.median(random_designs)
+
+
+def test_factorial_design():
+    design = FactorialDesign(xmin, xmax).generate(3)
+    assert design.shape == (27, 3)
+    assert len(np.unique(design, axis=0)) == 27
+    np.testing.assert_array_equal(np.unique(design[:, 1]), [-1.0, 0.0, 1.0])
+
+
+def test_optimized_latin_hypercube():
+    n = 30
+    design = OptimizedLatinHypercube(xmin, xmax, max_outer_iterations=20)
+    levels = np.argsort(np.random.rand(n, 3), axis=0)
+    initial = design.phi(design.squared_distances(levels))
+    best, phi = design.optimize(levels.copy())
+    # still a latin hypercube, with the running criterion matching a full recompute
+    for j in range(3):
+        np.testing.assert_array_equal(np.sort(best[:, j]), np.arange(n))
+    assert phi <= initial
+    np.testing.assert_allclose(phi, design.phi(design.squared_distances(best)), rtol=1e-6)
+
+    points = design.generate(n)
+    assert points.shape == (n, 3)
+    assert pdist((points - xmin) / (xmax - xmin)).min() > 0
+
+
+def test_factorial_grid():
+    grid = FactorialDesign(xmin, xmax).grid(4)
+    assert len(grid) == 64
+    # same points, in the same order, as the meshgrid construction
+    levels = [np.linspace(xmin[i], xmax[i], 4) for i in range(3)]
+    expected = np.vstack([g.ravel() for g in np.meshgrid(*levels)]).T
+    np.testing.assert_array_equal(grid[:], expected)
+    np.testing.assert_array_equal(grid[17], expected[17])
+    np.testing.assert_array_equal(grid[-1], expected[-1])
+    np.testing.assert_array_equal(grid[[3, 40]], expected[[3, 40]])
+    np.testing.assert_array_equal(np.vstack(list(grid.chunks(10, start=5, stop=50))), expected[5:50])
+    with pytest.raises(IndexError):
+        grid[64]
+
+    # far too large to materialize
+    huge = FactorialDesign(np.zeros(15), np.ones(15)).grid(10)
+    assert len(huge) == 10 ** 15
+    np.testing.assert_array_equal(huge[10 ** 15 - 1], np.ones(15))
+
+
+@pytest.mark.parametrize("design", [RandomSampling(xmin, xmax), LatinHypercube(xmin, xmax), SobolDesign(xmin, xmax)])
+def test_generate_shard(design):
+    full = design.generate_shard(1000, 0, 1, seed=7)
+    assert full.shape == (1000, 3)
+    assert np.all(full >= xmin) and np.all(full <= xmax)
+    # shards are slices of the same global design
+    shards = [design.generate_shard(1000, i, 7, seed=7) for i in range(7)]
+    np.testing.assert_array_equal(np.vstack(shards), full)
+    with pytest.raises(ValueError):
+        design.generate_shard(1000, 0, 2)
+
+
+def test_latin_hypercube_shards_are_stratified():
+    n = 500
+    design = np.vstack([LatinHypercube(xmin, xmax).generate_shard(n, i, 3, seed=1) for i in range(3)])
+    strata = np.floor((design - xmin) / (xmax - xmin) * n)
+    for j in range(3):
+        np.testing.assert_array_equal(np.sort(strata[:, j]), np.arange(n))
+
+
+def test_factorial_shards():
+    design = FactorialDesign(xmin, xmax)
+    np.testing.assert_array_equal(np.vstack([design.generate_shard(4, i, 5) for i in range(5)]), design.generate(4))
@@ -1,9 +1,10 @@
 def test_data():
-    from sciope.data import dataset
+    from sciope.data import dataset, spatial_index
 
 
 def test_designs():
-    from sciope.designs import initial_design_base, factorial_design, latin_hypercube_sampling, random_sampling
+    from sciope.designs import initial_design_base, factorial_design, latin_hypercube_sampling, \
+        optimized_latin_hypercube_sampling, random_sampling, sobol_design
 
 
 def test_features():
@@ -11,15 +12,15 @@ def test_features():
 
 
 def test_inference():
-    from sciope.inference import abc_inference, bandits_abc, inference_base
+    from sciope.inference import abc_inference, bandits_abc, bolfi, inference_base
 
 
 def test_models():
-    from sciope.models import ann_regressor, gp_regressor, label_propagation, model_base
+    from sciope.models import ann_regressor, gp_regressor, label_propagation, model_base, sparse_gp_regressor
 
 
 def test_sampling():
-    from sciope.sampling import maximin_sampling, sampling_base
+    from sciope.sampling import maximin_sampling, sampling_base, uncertainty_sampling
 
 
 def test_visualize():
@@ -30,6 +31,8 @@ def test_utilities():
     from sciope.utilities.distancefunctions import distance_base, euclidean, manhattan, naive_squared
     from sciope.utilities.housekeeping import sciope_logger, sciope_profiler
     from sciope.utilities.mab import mab_base, mab_direct, mab_halving, mab_incremental, mab_sar
-    from sciope.utilities.priors import prior_base, uniform_prior
+    from sciope.utilities.priors import prior_base, uniform_prior, log_uniform_prior, normal_prior, lognormal_prior, \
+        truncated_normal_prior, product_prior, qmc_prior
     from sciope.utilities.summarystats import burstiness, global_max, global_min, summary_base, temporal_mean, \
         temporal_variance
+    from sciope.utilities.transport import shared_memory_transport
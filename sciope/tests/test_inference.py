@@ -0,0 +1,103 @@
+from sciope.inference import abc_inference
+from sciope.inference.abc_inference import ABC
+from sciope.inference.bolfi import BOLFI
+from sciope.models.gp_regressor import GPRModel
+from sciope.models.model_base import ModelBase
+from sciope.utilities.priors.qmc_prior import QMCPrior
+from sciope.utilities.priors.uniform_prior import UniformPrior
+from sciope.utilities.transport import shared_memory_transport as smt
+from sciope.utilities.summarystats.summary_base import SummaryBase
+from sklearn.gaussian_process.kernels import ConstantKernel, RBF, WhiteKernel
+import numpy as np
+import pytest
+import queue
+
+
+class Mean(SummaryBase):
+    def __init__(self):
+        super(Mean, self).__init__('Mean', True)
+
+    def compute(self, data):
+        return np.mean(data).reshape(1, 1)
+
+
+def simulator(theta):
+    return np.ravel(theta)[0] + 0.1 * np.random.randn(1, 100)
+
+
+def test_abc_screening():
+    np.random.seed(0)
+    data = simulator(np.array([[5.0]]))
+    prior = UniformPrior(np.array([0.0]), np.array([10.0]))
+    # simulated distances are noisy, the kernel needs a noise term
+    model = GPRModel(kernel=ConstantKernel() * RBF() + WhiteKernel(1e-2), n_restarts=0, n_jobs=1)
+    abc = ABC(data, simulator, prior, epsilon=0.05, parallel_mode=False, summaries_function=Mean(),
+              screening_model=model, screening_start=30, retrain_every=30)
+    results = abc.infer(50)
+    assert results['accepted_count'] == 50
+    # most draws far from the data are skipped without simulating them
+    assert results['screened_count'] > 5 * results['trial_count']
+    accepted = np.ravel(results['accepted_samples'])
+    assert np.all(np.abs(accepted - 5.0) < 1.0)
+
+
+class Pessimist(ModelBase):
+    """
+    Screening model predicting a rejection everywhere
+    """
+    def __init__(self):
+        self.name = 'Pessimist'
+        self.train_count = 0
+
+    def train(self, inputs, targets):
+        self.scale_training_data(inputs, targets)
+        self.train_count += 1
+
+    def predict(self, xt):
+        return np.full((xt.shape[0], 1), 1e3), np.zeros(xt.shape[0])
+
+
+def test_abc_qmc_many_workers():
+    # the last of 128 processes still draws within the 2**30 points of the Sobol sequence
+    data = simulator(np.array([[5.0]]))
+    prior = QMCPrior(np.array([0.0]), np.array([10.0]), seed=1)
+    abc = ABC(data, simulator, prior, epsilon=0.5, parallel_mode=False, summaries_function=Mean())
+    output = queue.Queue()
+    abc.perform_abc(5, output, worker_id=127, qmc_stride=abc_inference.QMC_SEQUENCE_LENGTH // 128)
+    results = smt.receive(output.get())
+    assert results['accepted_count'] == 5
+
+
+def test_abc_screening_progress():
+    # a model that screens out every draw must not stall the sampling or its own retraining
+    np.random.seed(0)
+    data = simulator(np.array([[5.0]]))
+    prior = UniformPrior(np.array([0.0]), np.array([10.0]))
+    model = Pessimist()
+    abc = ABC(data, simulator, prior, epsilon=0.05, parallel_mode=False, summaries_function=Mean(),
+              screening_model=model, screening_start=10, retrain_every=10, max_screened_in_a_row=20)
+    results = abc.infer(5)
+    assert results['accepted_count'] == 5
+    assert results['screened_count'] <= 20 * results['trial_count']
+    # trained before the draws following the 10th, 20th, ... simulation
+    assert model.train_count == (results['trial_count'] - 11) // 10 + 1
+
+
+def noisy_simulator(theta):
+    return np.ravel(theta)[0] + np.random.randn(1, 25)
+
+
+@pytest.mark.parametrize("batch_size,n_jobs", [(1, 1), (4, 2)])
+def test_bolfi(batch_size, n_jobs):
+    np.random.seed(0)
+    data = noisy_simulator(np.array([[5.0]]))
+    prior = UniformPrior(np.array([0.0]), np.array([10.0]))
+    bolfi = BOLFI(data, noisy_simulator, prior, summaries_function=Mean(), n_initial=10, batch_size=batch_size,
+                  n_jobs=n_jobs)
+    results = bolfi.infer(40, num_samples=500)
+    assert results['trial_count'] == 40 and results['accepted_samples'].shape == (500, 1)
+    # the acquisition concentrates the simulations around the data
+    assert np.sum(np.abs(results['parameters'][10:, 0] - 5.0) < 1.0) > 15
+    # the exact posterior is close to N(mean(data), 0.2^2)
+    assert abs(results['inferred_parameters'][0] - np.mean(data)) < 0.3
+    assert 0.05 < np.std(results['accepted_samples']) < 0.6
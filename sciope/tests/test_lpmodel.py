@@ -18,3 +18,126 @@ def test_lpmodel(iris_data):
     model = label_propagation.LPModel()
     model.train(iris_data.data, iris_data.new_target)
     print(model.gamma)
+
+
+def test_lpmodel_update(iris_data):
+    model = label_propagation.LPModel()
+    model.x = iris_data.data[:100]
+    model.y = iris_data.new_target[:100]
+    model._fit()
+    model.update(iris_data.data[100:], iris_data.new_target[100:])
+    # the extended affinity matrix and the propagated labels match a fit on all data
+    reference = label_propagation.LPModel(gamma=model.gamma)
+    reference.x = iris_data.data
+    reference.y = iris_data.new_target
+    reference._fit()
+    np.testing.assert_allclose(model.cached_kernel.affinity, reference.cached_kernel.affinity, atol=1e-12)
+    np.testing.assert_allclose(model.model.label_distributions_, reference.model.label_distributions_, atol=1e-8)
+    np.testing.assert_array_equal(model.predict(iris_data.data[:10]), reference.predict(iris_data.data[:10]))
+
+
+def test_lpmodel_nystroem(iris_data):
+    exact = label_propagation.LPModel(gamma=1.0)
+    exact.x, exact.y = iris_data.data, iris_data.new_target
+    exact._fit()
+    approximate = label_propagation.LPModel(gamma=1.0, approximation='nystroem', n_components=100)
+    approximate.x, approximate.y = iris_data.data, iris_data.new_target
+    approximate._fit()
+    distributions = approximate.model.label_distributions_
+    assert distributions.shape == (150, 3)
+    np.testing.assert_allclose(distributions.sum(axis=1), 1)
+    # a low-rank graph spreads (nearly) the same labels
+    assert np.mean(approximate.model.transduction_ == exact.model.transduction_) > 0.9
+    assert np.mean(approximate.predict(iris_data.data) == exact.predict(iris_data.data)) > 0.9
+
+
+def test_lpmodel_nystroem_objective(iris_data):
+    model = label_propagation.LPModel(approximation='nystroem', n_components=20)
+    model.x, model.y = iris_data.data, iris_data.new_target
+    objective = model.objective
+    values = {}
+
+    def recording_objective(x):
+        value = objective(x)
+        # the same gamma gives the same objective value during the optimization
+        assert objective(x) == value
+        values[float(np.ravel(x)[0])] = value
+        return value
+    model.objective = recording_objective
+    model.optimize(0.01, 30, niter=2)
+    assert len(values) > 1 and model.random_state is None
+
+    # the final fit uses the components gamma was tuned with
+    model.gamma = min(values)
+    model._fit()
+    assert label_propagation.get_average_label_entropy(model.model.label_distributions_) + \
+        model.learning_rate * model.gamma ** 2 == values[model.gamma]
+
+
+def test_lpmodel_nystroem_random_state(iris_data):
+    model = label_propagation.LPModel(approximation='nystroem', n_components=20, random_state=7)
+    model.train(iris_data.data, iris_data.new_target, niter=1)
+    assert model.random_state == 7 and model.nystroem_seed == 7
+    assert model.model.random_state == 7
+
+
+def test_lpmodel_cached_objective(iris_data):
+    model = label_propagation.LPModel()
+    model.x, model.y = iris_data.data, iris_data.new_target
+    # the distances are computed once and reused for every gamma
+    for gamma in [0.5, 2.0, 5.0]:
+        value = model.objective(np.array([gamma]))
+        reference = label_propagation.LabelSpreading(kernel='rbf', alpha=model.alpha, gamma=gamma)
+        reference.fit(iris_data.data, iris_data.new_target)
+        expected = label_propagation.get_average_label_entropy(reference.label_distributions_) + gamma ** 2
+        np.testing.assert_allclose(value, expected, rtol=1e-8)
+    assert model.cached_kernel.gamma == 5.0
+
+
+def test_lpmodel_knn_graph(iris_data):
+    model = label_propagation.LPModel(gamma=1.0, n_neighbors=10)
+    model.x, model.y = iris_data.data, iris_data.new_target
+    model._fit()
+    affinity = model.cached_kernel.affinity
+    assert affinity.nnz <= 2 * 10 * 150
+    assert (affinity != affinity.T).nnz == 0
+    labeled = iris_data.new_target != -1
+    assert np.mean(model.model.transduction_[labeled] == iris_data.target[labeled]) > 0.9
+    assert np.mean(model.predict(iris_data.data) == iris_data.target) > 0.9
+
+
+def test_warm_label_spreading(iris_data):
+    kernel = label_propagation.CachedRBFKernel(1.0, iris_data.data)
+    model = label_propagation.WarmLabelSpreading(kernel, alpha=0.7).fit(iris_data.data, iris_data.new_target)
+    reference = label_propagation.LabelSpreading(kernel='rbf', alpha=0.7, gamma=1.0)
+    reference.fit(iris_data.data, iris_data.new_target)
+    np.testing.assert_allclose(model.label_distributions_, reference.label_distributions_, atol=1e-8)
+    np.testing.assert_allclose(model.predict_proba(iris_data.data[:10] + 0.01),
+                               reference.predict_proba(iris_data.data[:10] + 0.01), atol=1e-8)
+
+
+@pytest.mark.parametrize("n_neighbors", [None, 10])
+def test_lpmodel_incremental(n_neighbors):
+    x = np.random.rand(2000, 2)
+    target = (x[:, 0] > x[:, 1]).astype(int)
+    y = np.full(2000, -1)
+    y[:200] = target[:200]
+    model = label_propagation.LPModel(gamma=20.0, n_neighbors=n_neighbors)
+    model.x, model.y = x[:1950], y[:1950]
+    model._fit()
+
+    # add unlabeled points, then label a few points, warm starting from the previous distributions
+    model.update(x[1950:], y[1950:], warm_start=True)
+    assert model.model.label_distributions_.shape == (2000, 2)
+    model.relabel(np.arange(200, 203), target[200:203])
+    assert model.model.n_iter_ <= 5
+
+    # a few warm-started iterations get closer to the converged labels than as many iterations from scratch
+    converged = label_propagation.WarmLabelSpreading(model.cached_kernel, alpha=model.alpha, max_iter=1000, tol=1e-10)
+    converged.fit(model.x, model.y)
+    cold = label_propagation.WarmLabelSpreading(model.cached_kernel, alpha=model.alpha, max_iter=5)
+    cold.fit(model.x, model.y)
+    warm_error = np.abs(model.model.distributions_ - converged.distributions_).sum()
+    cold_error = np.abs(cold.distributions_ - converged.distributions_).sum()
+    assert warm_error < cold_error
+    assert np.mean(model.model.transduction_ == converged.transduction_) > 0.99
@@ -0,0 +1,254 @@
+from sciope.models import gp_regressor
+from sciope.models.ann_regressor import ANNModel
+from sciope.models.gp_regressor import GPRModel
+from sciope.models.model_base import ModelBase
+from sciope.models.sparse_gp_regressor import SparseGPRModel
+from sciope.models.svm_regressor import SVRModel
+from sciope.data.dataset import DataSet
+from sklearn.gaussian_process import GaussianProcessRegressor
+import numpy as np
+import pytest
+
+
+def target(x):
+    return np.sin(3 * x[:, 0]) + x[:, 1] ** 2
+
+
+def training_data(n):
+    x = np.random.rand(n, 2)
+    y = (target(x) + 0.01 * np.random.randn(n)).reshape(-1, 1)
+    return x, y
+
+
+def test_sparse_gp():
+    x, y = training_data(2000)
+    xt = np.random.rand(200, 2)
+    model = SparseGPRModel(num_inducing=50, num_hyperparameter_samples=300, batch_size=300)
+    model.train(x, y)
+    yp, sigma = model.predict(xt)
+    assert yp.shape == (200, 1) and sigma.shape == (200,)
+    assert np.sqrt(np.mean((yp.ravel() - target(xt)) ** 2)) < 0.05
+    assert np.all(sigma >= 0)
+
+    # mini-batches only change how the statistics are accumulated
+    reference = SparseGPRModel(num_inducing=50, batch_size=len(x))
+    reference.scale_training_data(x, y)
+    reference.kernel, reference.noise, reference.inducing = model.kernel, model.noise, model.inducing
+    reference.chol_mm = model.chol_mm
+    reference.a = np.zeros_like(model.a)
+    reference.b = np.zeros_like(model.b)
+    reference._accumulate(reference.x, reference.y)
+    yr, sigma_r = reference.predict(xt)
+    np.testing.assert_allclose(yr, yp, rtol=1e-6, atol=1e-8)
+    np.testing.assert_allclose(sigma_r, sigma, rtol=1e-6, atol=1e-8)
+
+
+def test_gp_parallel_restarts():
+    x = np.random.rand(60, 2)
+    y = target(x).reshape(-1, 1)
+    xt = np.random.rand(100, 2)
+    model = GPRModel(n_restarts=4, n_jobs=2, patience=2, max_time=60)
+    model.train(x, y)
+    yp, sigma = model.predict(xt)
+    assert yp.shape == (100, 1) and sigma.shape == (100,)
+    assert np.sqrt(np.mean((yp.ravel() - target(xt)) ** 2)) < 0.1
+
+    # training on grown data starts from the previous optimum
+    previous = model.kernel_
+    assert model._initial_kernel() is previous
+    x_new = np.random.rand(20, 2)
+    y_new = target(x_new).reshape(-1, 1)
+    model.n_restarts = 0
+    model.train(np.vstack((x, x_new)), np.vstack((y, y_new)))
+    np.testing.assert_allclose(model.kernel_.theta, previous.theta, atol=0.5)
+
+
+def test_gp_serial_by_default(monkeypatch):
+    # small refits, e.g. in a loop, do not start a process pool unless asked to
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a process pool was started")
+    monkeypatch.setattr(gp_regressor.mp, 'Pool', no_pool)
+    x, y = training_data(30)
+    model = GPRModel(n_restarts=2)
+    model.train(x, y)
+    assert model.n_jobs == 1
+
+
+def test_gp_update():
+    x, y = training_data(40)
+    x_new, y_new = training_data(10)
+    xt = np.random.rand(50, 2)
+    model = GPRModel(n_restarts=0, n_jobs=1)
+    model.train(x, y)
+    model.update(x_new, y_new)
+    assert model.n == 50
+
+    # same as conditioning on all data at once, with the same hyperparameters and scaling
+    reference = GaussianProcessRegressor(kernel=model.kernel_, optimizer=None)
+    reference.fit(np.vstack((x, x_new)), (np.vstack((y, y_new)).ravel() - model.my) / model.sy)
+    mean, std = reference.predict(xt, return_std=True)
+    yp, sigma = model.predict(xt)
+    np.testing.assert_allclose(yp.ravel(), mean * model.sy + model.my, rtol=1e-6, atol=1e-8)
+    np.testing.assert_allclose(sigma, std, rtol=1e-6, atol=1e-8)
+
+
+def test_sparse_gp_update():
+    x, y = training_data(600)
+    x_new, y_new = training_data(100)
+    model = SparseGPRModel(num_inducing=30, num_hyperparameter_samples=200)
+    model.train(x, y)
+    model.update(x_new, y_new)
+    assert model.n == 700
+
+    # the statistics are those of all data
+    a, b = model.a, model.b
+    model.a, model.b = np.zeros_like(a), np.zeros_like(b)
+    model._accumulate(model.x, model.y)
+    np.testing.assert_allclose(model.a, a, rtol=1e-10)
+    np.testing.assert_allclose(model.b, b, rtol=1e-10)
+
+
+def test_ann_update():
+    x, y = training_data(100)
+    x_new, y_new = training_data(20)
+    model = ANNModel()
+    model.train(x, y)
+    model.update(x_new, y_new)
+    assert model.n == 120 and model.predict(x_new).shape == (20, 1)
+
+
+def test_ann_early_stopping():
+    x, y = training_data(2000)
+    model = ANNModel(hidden_layer_sizes=(50, 50), activation='relu', solver='adam', max_iter=500, batch_size=100,
+                     early_stopping=True)
+    model.train(x, y)
+    assert model.model.n_iter_ < 500
+    assert np.sqrt(np.mean((model.predict(x).ravel() - y.ravel()) ** 2)) < 0.2
+
+
+def test_ann_train_dataset(tmp_path):
+    x, y = training_data(2000)
+    dataset = DataSet('training')
+    dataset.add_points(inputs=x, targets=y)
+    dataset.save(str(tmp_path))
+    dataset = DataSet.load(str(tmp_path))
+
+    model = ANNModel(hidden_layer_sizes=(50, 50), activation='relu', solver='adam', max_iter=300, batch_size=100,
+                     early_stopping=True)
+    model.train_dataset(dataset, chunk_size=500)
+    assert model.n_epochs_ < 300 and model.y is None
+    np.testing.assert_allclose([model.my, model.sy], [np.mean(y), np.std(y)])
+    assert np.sqrt(np.mean((model.predict(x).ravel() - y.ravel()) ** 2)) < 0.2
+
+    with pytest.raises(ValueError):
+        model.update(x[:10], y[:10])
+    with pytest.raises(ValueError):
+        ANNModel().train_dataset(dataset)
+
+
+@pytest.mark.parametrize("n_jobs,backend", [(1, 'thread'), (3, 'thread'), (2, 'process')])
+def test_predict_batch(n_jobs, backend):
+    x, y = training_data(50)
+    xt = np.random.rand(1050, 2)
+    gp = GPRModel(n_restarts=0, n_jobs=1)
+    gp.train(x, y)
+    yp, sigma = gp.predict(xt)
+    yb, sigma_b = gp.predict_batch(xt, chunk_size=100, n_jobs=n_jobs, backend=backend)
+    np.testing.assert_allclose(yb, yp)
+    np.testing.assert_allclose(sigma_b, sigma)
+
+    ann = ANNModel()
+    ann.train(x, y)
+    out = np.empty((1050, 1))
+    assert ann.predict_batch(xt, chunk_size=100, n_jobs=n_jobs, backend=backend, out=out) is out
+    np.testing.assert_allclose(out, ann.predict(xt))
+
+
+def test_predict_batch_in_flight():
+    x, y = training_data(50)
+    gp = GPRModel(n_restarts=0, n_jobs=1)
+    gp.train(x, y)
+    counts = {'taken': 0, 'done': 0, 'in_flight': 0}
+
+    class Inputs(object):
+        # test inputs that count the chunks taken from them
+        def __init__(self, values):
+            self.values = values
+            self.shape = values.shape
+
+        def __getitem__(self, key):
+            counts['taken'] += 1
+            counts['in_flight'] = max(counts['in_flight'], counts['taken'] - counts['done'])
+            return self.values[key]
+
+    predict = gp.predict
+
+    def counting_predict(xt):
+        result = predict(xt)
+        counts['done'] += 1
+        return result
+    gp.predict = counting_predict
+    xt = np.random.rand(1000, 2)
+    yb, sigma_b = gp.predict_batch(Inputs(xt), chunk_size=10, n_jobs=2)
+    np.testing.assert_allclose(yb, predict(xt)[0])
+    assert counts['done'] == 100 and counts['in_flight'] <= 4
+
+
+def test_save_load(tmp_path):
+    x, y = training_data(100)
+    xt = np.random.rand(20, 2)
+    model = GPRModel(n_restarts=0, n_jobs=1)
+    model.train(x, y)
+    model.save(str(tmp_path))
+
+    loaded = ModelBase.load(str(tmp_path))
+    assert isinstance(loaded, GPRModel)
+    assert loaded.my == model.my and loaded.sy == model.sy
+    # the Cholesky factor is memory-mapped, not read into memory
+    assert isinstance(loaded.model.L_.base, np.memmap) or not loaded.model.L_.flags.owndata
+    np.testing.assert_allclose(loaded.predict(xt)[0], model.predict(xt)[0])
+    np.testing.assert_allclose(loaded.predict(xt)[1], model.predict(xt)[1])
+
+    with pytest.raises(TypeError):
+        SparseGPRModel.load(str(tmp_path))
+
+
+@pytest.mark.parametrize("tuning", ["halving", "grid"])
+def test_svr_tuning(tuning):
+    x, y = training_data(300)
+    model = SVRModel(tuning=tuning, max_resources=200, n_jobs=2, min_halving_samples=100)
+    model.train(x, y)
+    assert set(model.best_params) == {'C', 'gamma'}
+    assert np.sqrt(np.mean((model.predict(x).ravel() - y.ravel()) ** 2)) < 0.5
+
+    # the tuned parameters are reused
+    def fail(*args):
+        raise AssertionError("parameters tuned again")
+    tune_parameters = model.tune_parameters
+    model.tune_parameters = fail
+    model.train(x, y)
+    x, y = training_data(899)
+    model.train(x, y)
+
+    # until the training set has grown by 'factor'
+    model.tune_parameters = tune_parameters
+    x, y = training_data(900)
+    model.train(x, y)
+    assert model.tuned_size == 900
+
+
+def test_svr_small_training_set():
+    # too few samples for successive halving: the full grid is searched
+    x, y = training_data(30)
+    halving, grid = SVRModel(tuning='halving'), SVRModel(tuning='grid')
+    halving.train(x, y)
+    grid.train(x, y)
+    assert halving.best_params == grid.best_params
+
+
+@pytest.mark.parametrize("approximation", ["nystroem", "rff"])
+def test_svr_approximation(approximation):
+    x, y = training_data(500)
+    model = SVRModel(approximation=approximation, n_components=100, Cs=(1, 10), gammas=(1, 10))
+    model.train(x, y)
+    assert np.sqrt(np.mean((model.predict(x).ravel() - y.ravel()) ** 2)) < 0.2
@@ -0,0 +1,55 @@
+from sciope.utilities.priors.uniform_prior import UniformPrior
+from sciope.utilities.priors.log_uniform_prior import LogUniformPrior
+from sciope.utilities.priors.normal_prior import NormalPrior
+from sciope.utilities.priors.lognormal_prior import LogNormalPrior
+from sciope.utilities.priors.truncated_normal_prior import TruncatedNormalPrior
+from sciope.utilities.priors.product_prior import ProductPrior
+from sciope.utilities.priors.qmc_prior import QMCPrior
+from scipy import stats
+import numpy as np
+import pytest
+
+
+def test_uniform_prior():
+    prior = UniformPrior(np.array([-2.0, 1.0]), np.array([-1.0, 5.0]))
+    samples = prior.draw(1000)
+    assert samples.shape == (1000, 2)
+    assert np.all(samples >= prior.lb) and np.all(samples <= prior.ub)
+    np.testing.assert_allclose(prior.logpdf(samples), -np.log(4.0))
+    assert prior.logpdf([0.0, 2.0])[0] == -np.inf
+
+
+@pytest.mark.parametrize("prior, reference", [
+    (NormalPrior([0.0, 1.0], [1.0, 2.0]), [stats.norm(0.0, 1.0), stats.norm(1.0, 2.0)]),
+    (LogNormalPrior([0.0, 1.0], [0.5, 1.0]), [stats.lognorm(0.5), stats.lognorm(1.0, scale=np.e)]),
+    (LogUniformPrior([1e-3, 1.0], [1.0, 10.0]), [stats.loguniform(1e-3, 1.0), stats.loguniform(1.0, 10.0)]),
+    (TruncatedNormalPrior([0.0, 0.0], [1.0, 1.0], [0.0, -1.0], [np.inf, 1.0]),
+     [stats.truncnorm(0.0, np.inf), stats.truncnorm(-1.0, 1.0)]),
+])
+def test_prior_logpdf(prior, reference):
+    samples = prior.draw(500)
+    assert samples.shape == (500, 2)
+    expected = reference[0].logpdf(samples[:, 0]) + reference[1].logpdf(samples[:, 1])
+    np.testing.assert_allclose(prior.logpdf(samples), expected)
+
+
+def test_product_prior():
+    uniform = UniformPrior(np.array([0.0]), np.array([2.0]))
+    normal = NormalPrior([0.0, 0.0], [1.0, 1.0])
+    prior = ProductPrior([uniform, normal])
+    samples = prior.draw(100)
+    assert samples.shape == (100, 3)
+    np.testing.assert_allclose(prior.logpdf(samples), uniform.logpdf(samples[:, :1]) + normal.logpdf(samples[:, 1:]))
+
+
+@pytest.mark.parametrize("sequence", ['sobol', 'halton'])
+def test_qmc_prior(sequence):
+    prior = QMCPrior([0.0, -1.0], [1.0, 1.0], sequence=sequence, seed=3)
+    first = prior.draw(8)
+    rest = prior.draw(8)
+    assert first.shape == (8, 2)
+    assert np.all(first >= prior.lb) and np.all(first <= prior.ub)
+
+    # the second worker continues the sequence where the first one stops
+    worker = QMCPrior([0.0, -1.0], [1.0, 1.0], sequence=sequence, seed=3).for_worker(1, 8)
+    np.testing.assert_allclose(worker.draw(8), rest)
@@ -0,0 +1,76 @@
+from sciope.sampling.maximin_sampling import MaximinSampling
+from sciope.sampling.uncertainty_sampling import UncertaintySampling
+from sciope.models.gp_regressor import GPRModel
+from scipy.spatial import distance_matrix
+import numpy as np
+import pytest
+
+xmin = np.array([0.0, -1.0])
+xmax = np.array([1.0, 1.0])
+
+
+def test_maximin_select_points():
+    x = np.random.uniform(xmin, xmax, size=(20, 2))
+    sampler = MaximinSampling(xmin, xmax, chunk_size=64)
+    new_points = sampler.select_points(x, 10)
+    assert new_points.shape == (10, 2)
+    assert np.all(new_points >= xmin) and np.all(new_points <= xmax)
+    # greedy maximin: each pick is at most as far from the current set as the previous pick
+    picked_distances = []
+    for point in new_points:
+        picked_distances.append(distance_matrix(point[None, :], x, p=1).min())
+        x = np.vstack((x, point))
+    assert np.all(np.diff(picked_distances) <= 1e-12)
+
+
+def test_maximin_min_distances_chunked():
+    c = np.random.rand(300, 2)
+    x = np.random.rand(50, 2)
+    expected = distance_matrix(c, x, p=1).min(axis=1)
+    np.testing.assert_allclose(MaximinSampling(xmin, xmax, chunk_size=7, use_tree=False).min_distances(c, x),
+                               expected)
+    np.testing.assert_allclose(MaximinSampling(xmin, xmax).min_distances(c, x), expected)
+
+
+def test_maximin_tree_follows_growing_samples():
+    x = np.random.rand(200, 2)
+    sampler = MaximinSampling(xmin, xmax)
+    x = np.vstack((x, sampler.select_point(x)))
+    index = sampler.index
+    x = np.vstack((x, sampler.select_points(x, 5)))
+    # the index of the extended samples is updated, not rebuilt
+    assert sampler.index is index and index.size == 201
+    c = np.random.rand(100, 2)
+    np.testing.assert_allclose(sampler.min_distances(c, x), distance_matrix(c, x, p=1).min(axis=1))
+    assert sampler.index is index and index.size == 206
+    # unrelated samples get a new index
+    sampler.min_distances(c, np.random.rand(10, 2))
+    assert sampler.index is not index
+
+
+@pytest.mark.parametrize("strategy", ["penalization", "believer"])
+def test_uncertainty_select_points(strategy):
+    x = np.random.uniform(xmin, xmax, size=(15, 2))
+    y = (np.sin(3 * x[:, 0]) + x[:, 1] ** 2).reshape(-1, 1)
+    model = GPRModel()
+    model.train(x, y)
+    sampler = UncertaintySampling(xmin, xmax, model, strategy=strategy)
+    new_points = sampler.select_points(x, 4)
+    assert new_points.shape == (4, 2)
+    assert np.all(new_points >= xmin) and np.all(new_points <= xmax)
+    # the batch is spread out instead of piling up at the most uncertain spot
+    assert distance_matrix(new_points, new_points)[np.triu_indices(4, k=1)].min() > 1e-3
+    # the first point is where the model is most uncertain
+    _, sigma = model.predict(new_points)
+    assert np.argmax(sigma) == 0 or np.isclose(np.max(sigma), sigma[0])
+
+
+def test_lipschitz_constant_duplicates():
+    c = np.random.uniform(xmin, xmax, size=(200, 2))
+    sigma = np.sin(c[:, 0]) + np.cos(c[:, 1])
+    lipschitz = UncertaintySampling.lipschitz_constant(c, sigma)
+    assert 0 < lipschitz <= np.sqrt(2)
+    # an exact and a near duplicate, with slightly different (noisy) sigma, leave the estimate unchanged
+    c = np.vstack((c, c[:1], c[1:2] + 1e-13))
+    sigma = np.concatenate((sigma, sigma[:1] + 1e-12, sigma[1:2] + 1e-12))
+    assert np.isclose(UncertaintySampling.lipschitz_constant(c, sigma), lipschitz)
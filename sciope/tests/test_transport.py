@@ -0,0 +1,22 @@
+from sciope.utilities.transport import shared_memory_transport as smt
+import multiprocessing as mp
+import numpy as np
+
+
+def _send(queue):
+    queue.put(smt.share({'ts': np.arange(200000, dtype=np.uint32).reshape(1000, 200), 's': np.ones(4), 'n': 3}))
+
+
+def test_share_receive():
+    queue = mp.Queue()
+    process = mp.Process(target=_send, args=(queue,))
+    process.start()
+    payload = queue.get()
+    process.join()
+
+    assert len(payload.blocks) == 1
+    results = smt.receive(payload)
+    np.testing.assert_array_equal(results['ts'], np.arange(200000, dtype=np.uint32).reshape(1000, 200))
+    assert not results['ts'].flags.owndata
+    np.testing.assert_array_equal(results['s'], np.ones(4))
+    assert results['n'] == 3
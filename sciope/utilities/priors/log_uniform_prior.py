@@ -0,0 +1,63 @@
+# Copyright 2019 Prashant Singh, Fredrik Wrede and Andreas Hellander
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+The Log-Uniform Prior
+"""
+
+# Imports
+from sciope.utilities.priors.prior_base import PriorBase
+from sciope.utilities.priors.uniform_prior import UniformPrior
+import numpy as np
+
+
+# Class definition: Log-Uniform Prior
+class LogUniformPrior(PriorBase):
+    """
+    The log-uniform (reciprocal) prior is uniform in the logarithm of each variable over a space described as:
+    [min_i, max_i], i=1..d, 0 < min_i < max_i. Suited for rate constants spanning several orders of magnitude.
+    """
+
+    def __init__(self, space_min, space_max):
+        """
+        Set up a log-uniform prior corresponding to the space bounded by:
+        :param space_min: the (positive) lowerbound of each variable/dimension
+        :param space_max: the upperbound of each variable/dimension
+        """
+        self.name = 'LogUniform'
+        self.lb = np.asarray(space_min, dtype=float)
+        self.ub = np.asarray(space_max, dtype=float)
+        np.testing.assert_array_less(0, self.lb, err_msg="Lower bounds of a log-uniform prior must be positive.")
+        self.uniform = UniformPrior(np.log(self.lb), np.log(self.ub))
+        self.dimension = self.uniform.dimension
+        super(LogUniformPrior, self).__init__(self.name)
+
+    def draw(self, n=1):
+        """
+        Draw 'n' samples within self.lb and self.ub
+        :param n: the desired number of samples
+        :return: n x d array of drawn samples
+        """
+        return np.exp(self.uniform.draw(n))
+
+    def logpdf(self, x):
+        """
+        Log density of the prior
+        :param x: a single point or an n x d array of points
+        :return: n-sized vector of log densities, -inf outside [lb, ub]
+        """
+        x = np.atleast_2d(x)
+        inside = np.all((x >= self.lb) & (x <= self.ub), axis=1)
+        log_x = np.log(np.where(x > 0, x, 1.0))
+        log_volume = np.sum(np.log(np.log(self.ub) - np.log(self.lb)))
+        return np.where(inside, -log_volume - np.sum(log_x, axis=1), -np.inf)
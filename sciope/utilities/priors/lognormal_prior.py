@@ -0,0 +1,58 @@
+# Copyright 2019 Prashant Singh, Fredrik Wrede and Andreas Hellander
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+The Log-Normal Prior
+"""
+
+# Imports
+from sciope.utilities.priors.prior_base import PriorBase
+from sciope.utilities.priors.normal_prior import NormalPrior
+import numpy as np
+
+
+# Class definition: Log-Normal Prior
+class LogNormalPrior(PriorBase):
+    """
+    Independent log-normal distributions in each of d dimensions, i.e. log(x_i) ~ N(mean_i, std_i^2), i=1..d
+    """
+
+    def __init__(self, mean, std):
+        """
+        Set up a log-normal prior
+        :param mean: the mean of the logarithm of each variable/dimension
+        :param std: the standard deviation of the logarithm of each variable/dimension
+        """
+        self.name = 'LogNormal'
+        self.normal = NormalPrior(mean, std)
+        self.dimension = self.normal.dimension
+        super(LogNormalPrior, self).__init__(self.name)
+
+    def draw(self, n=1):
+        """
+        Draw 'n' samples
+        :param n: the desired number of samples
+        :return: n x d array of drawn samples
+        """
+        return np.exp(self.normal.draw(n))
+
+    def logpdf(self, x):
+        """
+        Log density of the prior
+        :param x: a single point or an n x d array of points
+        :return: n-sized vector of log densities, -inf outside the positive orthant
+        """
+        x = np.atleast_2d(x)
+        positive = np.all(x > 0, axis=1)
+        log_x = np.log(np.where(x > 0, x, 1.0))
+        return np.where(positive, self.normal.logpdf(log_x) - np.sum(log_x, axis=1), -np.inf)
@@ -0,0 +1,57 @@
+# Copyright 2019 Prashant Singh, Fredrik Wrede and Andreas Hellander
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+The Normal Prior
+"""
+
+# Imports
+from sciope.utilities.priors.prior_base import PriorBase
+import numpy as np
+
+
+# Class definition: Normal Prior
+class NormalPrior(PriorBase):
+    """
+    Independent normal distributions in each of d dimensions, N(mean_i, std_i^2), i=1..d
+    """
+
+    def __init__(self, mean, std):
+        """
+        Set up a normal prior
+        :param mean: the mean of each variable/dimension
+        :param std: the standard deviation of each variable/dimension
+        """
+        self.name = 'Normal'
+        self.mean = np.asarray(mean, dtype=float)
+        self.std = np.asarray(std, dtype=float)
+        np.testing.assert_array_less(0, self.std, err_msg="Standard deviations must be positive.")
+        self.dimension = len(self.mean)
+        super(NormalPrior, self).__init__(self.name)
+
+    def draw(self, n=1):
+        """
+        Draw 'n' samples
+        :param n: the desired number of samples
+        :return: n x d array of drawn samples
+        """
+        return self.mean + self.std * np.random.standard_normal((n, self.dimension))
+
+    def logpdf(self, x):
+        """
+        Log density of the prior
+        :param x: a single point or an n x d array of points
+        :return: n-sized vector of log densities
+        """
+        z = (np.atleast_2d(x) - self.mean) / self.std
+        return -0.5 * np.sum(z ** 2, axis=1) - np.sum(np.log(self.std)) - 0.5 * self.dimension * np.log(2 * np.pi)
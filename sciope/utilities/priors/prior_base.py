@@ -23,6 +23,12 @@ from abc import ABCMeta, abstractmethod
 class PriorBase(object):
     """
     Base class for prior functions used by ABC inference algorithms and MAB-based statistic selection.
+    Each prior must implement the methods described herein:
+
+    * PriorBase.draw(n)
+    * PriorBase.logpdf(x)
+
+    Both operate on batches: draw returns an n x d array and logpdf takes an n x d array.
     """
     __metaclass__ = ABCMeta
 
@@ -40,3 +46,11 @@ class PriorBase(object):
         :param n: number of desired samples from prior; defaults to 1
         :return: the 'n' drawn samples as a vector
         """
+
+    @abstractmethod
+    def logpdf(self, x):
+        """
+        Evaluate the log density of the prior
+        :param x: a single d-dimensional point or an n x d array of points
+        :return: n-sized vector of log densities, -inf outside the support
+        """
@@ -0,0 +1,58 @@
+# Copyright 2019 Prashant Singh, Fredrik Wrede and Andreas Hellander
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+The Product Prior
+"""
+
+# Imports
+from sciope.utilities.priors.prior_base import PriorBase
+import numpy as np
+
+
+# Class definition: Product Prior
+class ProductPrior(PriorBase):
+    """
+    Composition of independent priors over disjoint groups of variables. The variables of the first prior come first,
+    e.g. ProductPrior([LogUniformPrior([1e-3], [1e2]), NormalPrior([0, 0], [1, 1])]) is a 3-dimensional prior.
+    """
+
+    def __init__(self, priors):
+        """
+        Set up a product of independent priors
+        :param priors: list of priors, each with a 'dimension' attribute
+        """
+        self.name = 'Product'
+        self.priors = list(priors)
+        dimensions = [prior.dimension for prior in self.priors]
+        self.dimension = int(np.sum(dimensions))
+        self.offsets = np.cumsum([0] + dimensions)
+        super(ProductPrior, self).__init__(self.name)
+
+    def draw(self, n=1):
+        """
+        Draw 'n' samples
+        :param n: the desired number of samples
+        :return: n x d array of drawn samples
+        """
+        return np.hstack([prior.draw(n) for prior in self.priors])
+
+    def logpdf(self, x):
+        """
+        Log density of the prior, the sum of the log densities of the components
+        :param x: a single point or an n x d array of points
+        :return: n-sized vector of log densities
+        """
+        x = np.atleast_2d(x)
+        return np.sum([prior.logpdf(x[:, start:stop]) for prior, start, stop in
+                       zip(self.priors, self.offsets[:-1], self.offsets[1:])], axis=0)
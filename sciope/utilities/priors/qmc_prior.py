@@ -0,0 +1,106 @@
+# Copyright 2019 Prashant Singh, Fredrik Wrede and Andreas Hellander
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+The Quasi-Monte Carlo Uniform Prior
+"""
+
+# Imports
+from sciope.utilities.priors.prior_base import PriorBase
+from sciope.utilities.priors.uniform_prior import UniformPrior
+from scipy.stats import qmc
+import numpy as np
+import warnings
+
+
+# Class definition: Quasi-Monte Carlo Uniform Prior
+class QMCPrior(PriorBase):
+    """
+    Uniform prior over [min_i, max_i], i=1..d, drawn from a low-discrepancy (Sobol or Halton) sequence instead of
+    pseudo-random numbers. Successive calls to draw continue the sequence, so the drawn points cover the space more
+    evenly than UniformPrior for the same number of simulations.
+
+    Parallel workers should each use their own copy obtained from 'for_worker', which skips ahead in the same
+    (identically scrambled) sequence so that the workers draw disjoint blocks of it.
+    """
+
+    def __init__(self, space_min, space_max, sequence='sobol', scramble=True, seed=None, skip=0):
+        """
+        Set up a quasi-Monte Carlo prior corresponding to the space bounded by:
+        :param space_min: the lowerbound of each variable/dimension
+        :param space_max: the upperbound of each variable/dimension
+        :param sequence: 'sobol' or 'halton'
+        :param scramble: randomize the sequence (Owen scrambling for Sobol, permutations for Halton)
+        :param seed: seed of the scrambling; copies made by for_worker share it
+        :param skip: number of points of the sequence to skip
+        """
+        if sequence not in ('sobol', 'halton'):
+            raise ValueError("Supported sequences are 'sobol' and 'halton', got {0}".format(sequence))
+        self.name = 'QMC'
+        self.lb = np.asarray(space_min, dtype=float)
+        self.ub = np.asarray(space_max, dtype=float)
+        self.dimension = len(self.lb)
+        self.sequence = sequence
+        self.scramble = scramble
+        if seed is None:
+            # Fix the scrambling so that worker copies draw from the same sequence
+            seed = np.random.randint(np.iinfo(np.int32).max)
+        self.seed = seed
+        self.skip = skip
+        self.uniform = UniformPrior(self.lb, self.ub)
+        if sequence == 'sobol':
+            self.engine = qmc.Sobol(self.dimension, scramble=scramble, seed=seed)
+        else:
+            self.engine = qmc.Halton(self.dimension, scramble=scramble, seed=seed)
+        self.fast_forward(skip)
+        super(QMCPrior, self).__init__(self.name)
+
+    def for_worker(self, worker_id, points_per_worker):
+        """
+        Copy of this prior for parallel worker 'worker_id', starting 'worker_id * points_per_worker' points further
+        into the sequence than this prior was created at
+        :param worker_id: index of the worker, starting at 0
+        :param points_per_worker: the maximum number of points each worker will draw
+        :return: a new QMCPrior
+        """
+        return QMCPrior(self.lb, self.ub, self.sequence, self.scramble, self.seed,
+                        self.skip + worker_id * points_per_worker)
+
+    def fast_forward(self, n):
+        """
+        Skip the next 'n' points of the sequence
+        :param n: number of points to skip
+        :return: -
+        """
+        if n > 0:
+            self.engine.fast_forward(n)
+
+    def draw(self, n=1):
+        """
+        Draw the next 'n' points of the sequence scaled to [lb, ub]
+        :param n: the desired number of samples
+        :return: n x d array of drawn samples
+        """
+        with warnings.catch_warnings():
+            # Sobol warns when n is not a power of 2, which is expected for sequential draws
+            warnings.simplefilter('ignore', UserWarning)
+            unit_samples = self.engine.random(n)
+        return qmc.scale(unit_samples, self.lb, self.ub)
+
+    def logpdf(self, x):
+        """
+        Log density of the uniform distribution over the box [lb, ub]
+        :param x: a single point or an n x d array of points
+        :return: n-sized vector of log densities, -inf outside the box
+        """
+        return self.uniform.logpdf(x)
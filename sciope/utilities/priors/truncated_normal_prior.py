@@ -0,0 +1,65 @@
+# Copyright 2019 Prashant Singh, Fredrik Wrede and Andreas Hellander
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+The Truncated Normal Prior
+"""
+
+# Imports
+from sciope.utilities.priors.prior_base import PriorBase
+from scipy.stats import truncnorm
+import numpy as np
+
+
+# Class definition: Truncated Normal Prior
+class TruncatedNormalPrior(PriorBase):
+    """
+    Independent normal distributions N(mean_i, std_i^2) truncated to [min_i, max_i], i=1..d
+    """
+
+    def __init__(self, mean, std, space_min, space_max):
+        """
+        Set up a truncated normal prior
+        :param mean: the mean of each variable/dimension before truncation
+        :param std: the standard deviation of each variable/dimension before truncation
+        :param space_min: the lowerbound of each variable/dimension, may be -np.inf
+        :param space_max: the upperbound of each variable/dimension, may be np.inf
+        """
+        self.name = 'TruncatedNormal'
+        self.mean = np.asarray(mean, dtype=float)
+        self.std = np.asarray(std, dtype=float)
+        self.lb = np.asarray(space_min, dtype=float)
+        self.ub = np.asarray(space_max, dtype=float)
+        np.testing.assert_array_less(0, self.std, err_msg="Standard deviations must be positive.")
+        np.testing.assert_array_less(self.lb, self.ub, err_msg="Lower bounds must be smaller than upper bounds.")
+        self.dimension = len(self.mean)
+        # scipy parameterizes the truncation in standardized units
+        self.distribution = truncnorm((self.lb - self.mean) / self.std, (self.ub - self.mean) / self.std,
+                                      loc=self.mean, scale=self.std)
+        super(TruncatedNormalPrior, self).__init__(self.name)
+
+    def draw(self, n=1):
+        """
+        Draw 'n' samples
+        :param n: the desired number of samples
+        :return: n x d array of drawn samples
+        """
+        return self.distribution.rvs(size=(n, self.dimension))
+
+    def logpdf(self, x):
+        """
+        Log density of the prior
+        :param x: a single point or an n x d array of points
+        :return: n-sized vector of log densities, -inf outside [lb, ub]
+        """
+        return np.sum(self.distribution.logpdf(np.atleast_2d(x)), axis=1)
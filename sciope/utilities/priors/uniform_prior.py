@@ -36,6 +36,7 @@ class UniformPrior(PriorBase):
         self.name = 'Uniform'
         self.lb = space_min
         self.ub = space_max
+        self.dimension = len(space_min)
         super(UniformPrior, self).__init__(self.name)
 
     def draw(self, n=1):
@@ -44,15 +45,18 @@ class UniformPrior(PriorBase):
         :param n: the desired number of samples
         :return: the n-sized vector of drawn samples
         """
-        d = len(self.lb)
+        lb = np.asarray(self.lb, dtype=float)
+        ub = np.asarray(self.ub, dtype=float)
+        return lb + np.random.random((n, len(lb))) * (ub - lb)
 
-        # Generate samples in [-1,1]
-        generated_samples = np.random.random((n, d)) * 2 - 1
-
-        # scale from [-1,1] to problem range
-        scaled_values = generated_samples
-        for j in range(0, d):
-            scaled_values[:, j] = abs((((generated_samples[:, j] + 1) *
-                                        (self.ub[j] - self.lb[j])) / 2) + self.lb[j])
-
-        return scaled_values
+    def logpdf(self, x):
+        """
+        Log density of the uniform distribution over the box [lb, ub]
+        :param x: a single point or an n x d array of points
+        :return: n-sized vector of log densities, -inf outside the box
+        """
+        lb = np.asarray(self.lb, dtype=float)
+        ub = np.asarray(self.ub, dtype=float)
+        x = np.atleast_2d(x)
+        inside = np.all((x >= lb) & (x <= ub), axis=1)
+        return np.where(inside, -np.sum(np.log(ub - lb)), -np.inf)
@@ -0,0 +1,140 @@
+# Copyright 2019 Prashant Singh, Fredrik Wrede and Andreas Hellander
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Zero-copy transport of simulation results between processes on the same host
+
+Objects are pickled with protocol 5, which hands the raw data of large numpy arrays to a callback instead of copying
+it into the pickle stream. The sending process places each such buffer in a shared memory block and passes only the
+small pickle stream and the block names (e.g. through a multiprocessing.Queue). The receiving process maps the blocks
+and rebuilds the arrays directly on top of the shared memory, without deserializing or copying the data.
+"""
+
+# Imports
+from multiprocessing import shared_memory, resource_tracker
+import pickle
+
+# Buffers smaller than this are kept in the pickle stream, shared memory blocks only pay off for larger arrays
+MIN_SHARED_BYTES = 1 << 16
+
+
+def dumps_out_of_band(obj, min_bytes=MIN_SHARED_BYTES):
+    """
+    Pickle 'obj' with protocol 5, keeping the data of large contiguous arrays out of the pickle stream
+    :param obj: the object to serialize
+    :param min_bytes: buffers smaller than this are serialized in-band
+    :return: the pickle stream and the list of out-of-band pickle.PickleBuffer objects, in order
+    """
+    buffers = []
+
+    def collect(buffer):
+        if buffer.raw().nbytes < max(min_bytes, 1):
+            # A true return value tells pickle to serialize the buffer in-band
+            return True
+        buffers.append(buffer)
+        return False
+
+    data = pickle.dumps(obj, protocol=5, buffer_callback=collect)
+    return data, buffers
+
+
+def loads_out_of_band(data, buffers):
+    """
+    Rebuild an object written by dumps_out_of_band. Arrays are created as views of 'buffers', not copies.
+    :param data: the pickle stream
+    :param buffers: objects supporting the buffer protocol holding the out-of-band data, in order
+    :return: the object
+    """
+    return pickle.loads(data, buffers=buffers)
+
+
+def _attach(name, nbytes):
+    """
+    Map the shared memory block 'name' and return a memoryview of its first 'nbytes' bytes. The memory is released
+    once the last array built on top of the view is garbage collected.
+    """
+    block = shared_memory.SharedMemory(name=name)
+    # The mapping stays valid after unlinking, so the name can be removed right away
+    block.unlink()
+    if not (hasattr(block, '_mmap') and hasattr(block, '_buf')):
+        # SharedMemory offers no public way to keep the mapping alive beyond close(). Should its (CPython) private
+        # attributes change, fall back to copying the data out of the block.
+        data = bytearray(block.buf[:nbytes])
+        block.close()
+        return memoryview(data)
+    # Hand the mapping over to the memoryview: SharedMemory.close() would unmap it while arrays still point into it
+    mapping = block._mmap
+    block._buf.release()
+    block._buf = None
+    block._mmap = None
+    block.close()
+    return memoryview(mapping)[:nbytes]
+
+
+def _create_untracked(size):
+    """
+    Create a shared memory block that the resource tracker of this process does not remove when this process exits,
+    as the receiving process owns and unlinks it
+    """
+    try:
+        # Python >= 3.13
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    except TypeError:
+        block = shared_memory.SharedMemory(create=True, size=size)
+        # The tracker registers the platform name of the block, which is '/' + name on POSIX
+        resource_tracker.unregister(getattr(block, '_name', '/' + block.name), 'shared_memory')
+        return block
+
+
+class SharedPayload(object):
+    """
+    Picklable handle to an object whose large arrays were placed in shared memory by 'share'. It is small, so sending
+    it through a queue or pipe is cheap. Each payload must be received exactly once.
+    """
+
+    def __init__(self, data, blocks):
+        """
+        :param data: the pickle stream
+        :param blocks: list of (shared memory name, number of bytes) for the out-of-band buffers
+        """
+        self.data = data
+        self.blocks = blocks
+
+
+def share(obj, min_bytes=MIN_SHARED_BYTES):
+    """
+    Sending side: copy the large arrays of 'obj' into shared memory blocks. The blocks live until the payload is
+    received, a payload that is never received leaks its blocks.
+    :param obj: the object to send, typically a dict or list of numpy arrays
+    :param min_bytes: arrays smaller than this are sent in the pickle stream
+    :return: a SharedPayload to pass to the receiving process
+    """
+    data, buffers = dumps_out_of_band(obj, min_bytes)
+    blocks = []
+    for buffer in buffers:
+        raw = buffer.raw()
+        block = _create_untracked(raw.nbytes)
+        block.buf[:raw.nbytes] = raw
+        blocks.append((block.name, raw.nbytes))
+        block.close()
+    return SharedPayload(data, blocks)
+
+
+def receive(payload):
+    """
+    Receiving side: rebuild the object sent with 'share', mapping its arrays onto the shared memory blocks
+    :param payload: the SharedPayload
+    :return: the object
+    """
+    buffers = [_attach(name, nbytes) for name, nbytes in payload.blocks]
+    return loads_out_of_band(payload.data, buffers)